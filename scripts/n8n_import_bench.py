@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the n8n master importer hot paths.
+
+Generates a deterministic synthetic template corpus (folders + ZIP archives,
+`workflows`/`workflow` wrappers, duplicates and name collisions), times each
+importer stage on it and prints machine-readable JSON that can be compared
+across commits.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from n8n_mock_server import MockN8nState, make_server
+
+from n8n_master_import import (
+    N8nApiClient,
+    NameAllocator,
+    discover_local_json_files,
+    discover_sources,
+    extract_workflows_from_json,
+    import_candidates,
+    iter_source_candidates,
+    json_fingerprint,
+    load_json_file,
+    make_unique_name,
+    normalize_workflow,
+)
+
+NODE_TYPES = [
+    "n8n-nodes-base.manualTrigger",
+    "n8n-nodes-base.webhook",
+    "n8n-nodes-base.httpRequest",
+    "n8n-nodes-base.set",
+    "n8n-nodes-base.if",
+    "n8n-nodes-base.code",
+    "n8n-nodes-base.slack",
+    "n8n-nodes-base.telegram",
+    "n8n-nodes-base.googleSheets",
+    "@n8n/n8n-nodes-langchain.openAi",
+]
+COLLIDING_NAMES = ["My workflow", "Untitled", "My workflow 2", "Imported Workflow"]
+
+
+class BenchClient:
+    # In-process stand-in for N8nApiClient so the end-to-end timing measures
+    # the importer itself rather than network latency.
+    def __init__(self) -> None:
+        self.created = 0
+        self.versions: Dict[str, str] = {}
+
+    def iter_workflows(self) -> Iterator[Dict]:
+        return iter(())
+
+    def create_workflow(self, workflow: Dict) -> Tuple[bool, str]:
+        self.created += 1
+        return True, str(self.created)
+
+
+def legacy_json_fingerprint(workflow: Dict) -> str:
+    # The importer's fingerprint before the blake2b engine, kept here as the
+    # baseline json_fingerprint is measured against.
+    reduced = dict(workflow)
+    reduced.pop("name", None)
+    reduced.pop("active", None)
+    canonical = json.dumps(reduced, sort_keys=True, ensure_ascii=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def make_workflow(rng: random.Random, index: int, nodes: int, collision_rate: float) -> Dict:
+    name = rng.choice(COLLIDING_NAMES) if rng.random() < collision_rate else f"Template {index}"
+    node_rows = []
+    for position in range(nodes):
+        node_type = rng.choice(NODE_TYPES)
+        node_rows.append(
+            {
+                "id": f"{index}-{position}",
+                "name": f"Node {position}",
+                "type": node_type,
+                "typeVersion": rng.choice([1, 2, 3.1, "2"]),
+                "position": [position * 220, rng.randint(0, 600)],
+                "parameters": {
+                    "url": f"https://example.com/{index}/{position}",
+                    "options": {"timeout": rng.randint(1, 60), "headers": [{"name": "x", "value": "y"}]},
+                    "value": rng.random(),
+                },
+                "disabled": rng.random() < 0.05,
+            }
+        )
+    connections = {
+        f"Node {position}": {"main": [[{"node": f"Node {position + 1}", "type": "main", "index": 0}]]}
+        for position in range(nodes - 1)
+    }
+    return {
+        "name": name,
+        "active": False,
+        "nodes": node_rows,
+        "connections": connections,
+        "settings": {"executionOrder": "v1"},
+        "pinData": {},
+    }
+
+
+def generate_corpus(
+    root: Path,
+    workflows: int,
+    nodes: int = 12,
+    nesting_rate: float = 0.2,
+    duplicate_rate: float = 0.1,
+    collision_rate: float = 0.3,
+    folders: int = 8,
+    zips: int = 2,
+    seed: int = 1234,
+) -> Dict[str, int]:
+    rng = random.Random(seed)
+    payloads: List[object] = []
+    generated: List[Dict] = []
+    index = 0
+    while index < workflows:
+        if generated and rng.random() < duplicate_rate:
+            payloads.append(json.loads(json.dumps(rng.choice(generated))))
+            index += 1
+            continue
+        if rng.random() < nesting_rate:
+            if rng.random() < 0.5:
+                batch = [make_workflow(rng, index + offset, nodes, collision_rate) for offset in range(3)]
+                generated.extend(batch)
+                payloads.append({"workflows": batch})
+                index += len(batch)
+            else:
+                workflow = make_workflow(rng, index, nodes, collision_rate)
+                generated.append(workflow)
+                payloads.append({"workflow": workflow})
+                index += 1
+            continue
+        workflow = make_workflow(rng, index, nodes, collision_rate)
+        generated.append(workflow)
+        payloads.append(workflow)
+        index += 1
+
+    root.mkdir(parents=True, exist_ok=True)
+    archives = [zipfile.ZipFile(root / f"pack_{number}.zip", "w", zipfile.ZIP_DEFLATED) for number in range(zips)]
+    files = 0
+    try:
+        for position, payload in enumerate(payloads):
+            text = json.dumps(payload)
+            slot = position % (folders + zips)
+            if slot < folders:
+                folder = root / f"folder_{slot}"
+                folder.mkdir(exist_ok=True)
+                (folder / f"workflow_{position}.json").write_text(text, encoding="utf-8")
+            else:
+                archives[slot - folders].writestr(f"templates/workflow_{position}.json", text)
+            files += 1
+        # Noise the walker and parser have to skip.
+        (root / "folder_0" / "package.json").write_text('{"name": "not-a-workflow"}', encoding="utf-8")
+        (root / "folder_0" / "node_modules" / "dep").mkdir(parents=True, exist_ok=True)
+        (root / "folder_0" / "node_modules" / "dep" / "package.json").write_text("{}", encoding="utf-8")
+    finally:
+        for archive in archives:
+            archive.close()
+    return {"files": files, "workflows": workflows}
+
+
+def best_of(repeat: int, func: Callable[[], int]) -> Dict[str, float]:
+    best: Optional[float] = None
+    items = 0
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        items = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    seconds = best or 0.0
+    return {
+        "seconds": round(seconds, 6),
+        "items": items,
+        "perSecond": round(items / seconds, 1) if seconds else 0.0,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run_benchmarks(root: Path, repeat: int, workers: int) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    json_files = list(discover_local_json_files([root]))
+    payloads = [(path, load_json_file(path)) for path in json_files]
+    raw_workflows: List[Dict] = []
+    for path, payload in payloads:
+        if isinstance(payload, dict):
+            raw_workflows.extend([payload] + list(payload.get("workflows") or []))
+            if isinstance(payload.get("workflow"), dict):
+                raw_workflows.append(payload["workflow"])
+    normalized = [
+        workflow
+        for path, payload in payloads
+        if payload is not None
+        for workflow in extract_workflows_from_json(payload, str(path))
+    ]
+    names = [workflow["name"] for workflow in normalized]
+
+    results["discover_local_json_files"] = best_of(repeat, lambda: sum(1 for _ in discover_local_json_files([root])))
+    results["load_json_file"] = best_of(repeat, lambda: sum(1 for path in json_files if load_json_file(path)))
+    results["normalize_workflow"] = best_of(
+        repeat, lambda: sum(1 for raw in raw_workflows if normalize_workflow(raw, "bench.json"))
+    )
+    results["legacy_json_fingerprint[sha1]"] = best_of(
+        repeat, lambda: sum(1 for workflow in normalized if legacy_json_fingerprint(workflow))
+    )
+    for mode in ("exact", "structural"):
+        results[f"json_fingerprint[{mode}]"] = best_of(
+            repeat, lambda mode=mode: sum(1 for workflow in normalized if json_fingerprint(workflow, mode))
+        )
+    results["make_unique_name"] = best_of(
+        repeat, lambda: len([make_unique_name(name, used) for used in [set()] for name in names])
+    )
+    results["NameAllocator.allocate"] = best_of(
+        repeat, lambda: len([allocator.allocate(name) for allocator in [NameAllocator()] for name in names])
+    )
+
+    def end_to_end() -> int:
+        client = BenchClient()
+        with tempfile.TemporaryDirectory(prefix="n8n-bench-report-") as report_dir:
+            stats = {"files": 0, "candidates": 0}
+            candidates = iter_source_candidates(discover_sources([root]), stats, workers=workers)
+            summary = import_candidates(client, candidates, Path(report_dir) / "report.json")  # type: ignore[arg-type]
+        return int(summary["totalCandidates"])
+
+    results["end_to_end_import"] = best_of(repeat, end_to_end)
+    return results
+
+
+def run_mock_import(root: Path, concurrency: int, workers: int, state_options: Dict) -> Dict[str, float]:
+    # Full HTTP path against the bundled mock server: pooled sessions,
+    # retries/backoff and the existing-workflow listing are all exercised.
+    state = MockN8nState(**state_options)
+    server = make_server("127.0.0.1", 0, state)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = N8nApiClient(
+            f"http://127.0.0.1:{server.server_address[1]}",
+            "bench",
+            pool_size=concurrency,
+            backoff_base=0.05,
+            backoff_max=1.0,
+        )
+        with tempfile.TemporaryDirectory(prefix="n8n-bench-report-") as report_dir:
+            stats = {"files": 0, "candidates": 0}
+            started = time.perf_counter()
+            candidates = iter_source_candidates(discover_sources([root]), stats, workers=workers)
+            summary = import_candidates(client, candidates, Path(report_dir) / "report.json", concurrency=concurrency)
+            seconds = time.perf_counter() - started
+    finally:
+        server.shutdown()
+        server.server_close()
+    return {
+        "seconds": round(seconds, 6),
+        "items": int(summary["imported"]),
+        "perSecond": round(summary["imported"] / seconds, 1) if seconds else 0.0,
+        "failed": int(summary["failed"]),
+        "serverRequests": state.stats["requests"],
+        "serverThrottled": state.stats["throttled"],
+        "serverErrors": state.stats["errors"],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the n8n master importer on a synthetic corpus.")
+    parser.add_argument("--workflows", type=int, default=2000)
+    parser.add_argument("--nodes", type=int, default=12, help="Nodes per generated workflow")
+    parser.add_argument("--nesting-rate", type=float, default=0.2, help="Share of workflows/workflow wrappers")
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--collision-rate", type=float, default=0.3, help="Share of workflows with a common name")
+    parser.add_argument("--folders", type=int, default=8)
+    parser.add_argument("--zips", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the fastest is reported")
+    parser.add_argument("--workers", type=int, default=0, help="Process pool size for the end-to-end scan")
+    parser.add_argument("--mock", action="store_true", help="Also run the import over HTTP against the mock server")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel creates for the --mock run")
+    parser.add_argument("--mock-latency-ms", type=float, default=5.0)
+    parser.add_argument("--mock-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--mock-error-rate", type=float, default=0.0)
+    parser.add_argument("--corpus", default="", help="Keep the generated corpus in this folder")
+    parser.add_argument("--output", default="", help="Write results JSON here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="n8n-bench-corpus-") as temp_dir:
+        root = Path(args.corpus) if args.corpus else Path(temp_dir)
+        corpus = generate_corpus(
+            root,
+            workflows=args.workflows,
+            nodes=args.nodes,
+            nesting_rate=args.nesting_rate,
+            duplicate_rate=args.duplicate_rate,
+            collision_rate=args.collision_rate,
+            folders=args.folders,
+            zips=args.zips,
+            seed=args.seed,
+        )
+        print(f"[bench] corpus={root} files={corpus['files']} workflows={corpus['workflows']}", file=sys.stderr)
+        # The importer prints progress to stdout; keep stdout for the JSON.
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run_benchmarks(root, args.repeat, args.workers)
+            if args.mock:
+                results["mock_http_import"] = run_mock_import(
+                    root,
+                    concurrency=max(1, args.concurrency),
+                    workers=args.workers,
+                    state_options={
+                        "latency_ms": args.mock_latency_ms,
+                        "throttle_rate": args.mock_throttle_rate,
+                        "error_rate": args.mock_error_rate,
+                        "seed": args.seed,
+                    },
+                )
+
+    payload = {
+        "timestamp": int(time.time()),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {key: value for key, value in vars(args).items() if key not in {"corpus", "output"}},
+        "results": results,
+    }
+    text = json.dumps(payload, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
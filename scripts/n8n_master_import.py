@@ -13,19 +13,35 @@ Features:
 from __future__ import annotations
 
 import argparse
+import bisect
+import codecs
 import hashlib
 import json
+import mmap
+import multiprocessing
+import operator
+import os
+import queue
+import random
 import re
-import shutil
+import sqlite3
+import struct
 import sys
-import tempfile
+import threading
 import time
 import zipfile
-from dataclasses import dataclass
+import zlib
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import IO, Callable, Deque, Dict, Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 
 
 DEFAULT_LOCAL_ROOTS = [
@@ -55,7 +71,6 @@ IGNORE_DIR_NAMES = {
     ".next",
 }
 
-ALLOWED_WORKFLOW_KEYS = {"name", "nodes", "connections", "settings"}
 ALLOWED_NODE_KEYS = {
     "name",
     "type",
@@ -75,21 +90,496 @@ ALLOWED_NODE_KEYS = {
     "notesInFlow",
     "webhookId",
 }
+NODE_FLAG_KEYS = {"disabled", "alwaysOutputData", "continueOnFail", "retryOnFail", "executeOnce", "notesInFlow"}
+NODE_NUMBER_KEYS = {"maxTries", "waitBetweenTries"}
 ALLOWED_ON_ERROR_VALUES = {"stopWorkflow", "continueRegularOutput", "continueErrorOutput"}
+MAX_NAME_LENGTH = 180
+NAME_CACHE_SIZE = 100_000
 ALLOWED_CALLER_POLICIES = {"any", "none", "workflowsFromAList", "workflowsFromSameOwner"}
+DEDUPE_MODES = ("exact", "structural")
+# Bump when json_fingerprint output changes so stored index fingerprints are dropped.
+FINGERPRINT_VERSION = 3
+FINGERPRINT_NODE_SLICE = 64
+INDEX_SCHEMA_VERSION = 5
+JOURNAL_SYNC_RECORDS = 64
+JOURNAL_SYNC_SECONDS = 1.0
+MINHASH_PERMUTATIONS = 64
+MINHASH_COLUMN_CACHE_SIZE = 50_000
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE"}
+STAGE_QUEUE_SIZE = 256
+WALK_QUEUE_SIZE = 4096
+PARSE_CHUNK_FILES = 64
+PARSE_CHUNK_BYTES = 8_000_000
+# Sources above this size are parsed incrementally instead of read whole.
+STREAM_PARSE_BYTES = 16_000_000
+STREAM_CHUNK_BYTES = 1 << 20
+SOURCE_CACHE_SIZE = 4
+DOWNLOAD_CHUNK_BYTES = 1 << 20
+CATALOG_MAGIC = b"N8NCAT2\n"
+CATALOG_COMPRESS_LEVEL = 6
+NODE_TYPES_TTL_SECONDS = 24 * 3600
+DEFAULT_DOWNLOAD_CACHE = Path.home() / ".cache" / "n8n-master-import" / "repos"
+# Source task statuses that mean this run really listed the source's current
+# contents; anything else (missing root, failed or stale download) does not.
+SCANNED_SOURCE_STATUSES = {"ok", "downloaded", "not modified"}
+OUTCOME_FIELDS = (
+    "imported",
+    "updated",
+    "unchanged",
+    "adopted",
+    "archived",
+    "skippedDuplicates",
+    "skippedNearDuplicates",
+    "failed",
+    "duplicateSources",
+    "rejected",
+)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+T = TypeVar("T")
+
+_FINGERPRINT_ENCODER = json.JSONEncoder(
+    sort_keys=True, ensure_ascii=False, check_circular=False, separators=(",", ":")
+)
+_MINHASH_COLUMNS: Dict[str, bytes] = {}
+_STREAM_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class _StageTimer:
+    __slots__ = ("metrics", "stage", "wall", "cpu")
+
+    def __init__(self, metrics: "Metrics", stage: str) -> None:
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self) -> "_StageTimer":
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.metrics.add_stage(self.stage, time.perf_counter() - self.wall, time.thread_time() - self.cpu)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
 
 
-@dataclass
+_NULL_TIMER = _NullTimer()
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Run telemetry: per-stage wall/CPU time, counters, gauges and latency
+# histograms, exported as a node_exporter textfile and/or JSON-lines events.
+# Everything is a no-op until configure() is called; hot paths check
+# ``enabled`` first so a disabled run pays one attribute lookup per call site.
+class Metrics:
+    def __init__(self) -> None:
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._log: Optional[IO[str]] = None
+        self.stages: Dict[str, List[float]] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+
+    def configure(self, log_path: Optional[Path] = None) -> None:
+        self.enabled = True
+        if log_path is not None:
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            self._log = log_path.open("a", encoding="utf-8", buffering=1)
+
+    def stage(self, name: str) -> Union[_StageTimer, _NullTimer]:
+        return _StageTimer(self, name) if self.enabled else _NULL_TIMER
+
+    def add_stage(self, name: str, wall: float, cpu: float) -> None:
+        # Stages running on several threads add up, so wall can exceed the run.
+        with self._lock:
+            totals = self.stages.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += wall
+            totals[1] += cpu
+            totals[2] += 1
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        if self.enabled:
+            with self._lock:
+                self.gauges[name] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            # One slot per bucket plus +Inf, then sum and count.
+            row = self.histograms.get(key)
+            if row is None:
+                row = self.histograms[key] = [0.0] * (len(LATENCY_BUCKETS) + 3)
+            row[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def event(self, name: str, **fields: object) -> None:
+        if self._log is None:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), "event": name, **fields}, ensure_ascii=False)
+        with self._lock:
+            self._log.write(line + "\n")
+
+    def write_textfile(self, path: Path) -> None:
+        lines: List[str] = []
+
+        def labels_text(labels: Iterable[Tuple[str, str]]) -> str:
+            parts = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels)
+            return f"{{{parts}}}" if parts else ""
+
+        with self._lock:
+            stages = sorted(self.stages.items())
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted((key, list(row)) for key, row in self.histograms.items())
+
+        for suffix, slot in (("wall_seconds_total", 0), ("cpu_seconds_total", 1), ("calls_total", 2)):
+            if stages:
+                lines.append(f"# TYPE n8n_import_stage_{suffix} counter")
+            for stage, totals in stages:
+                lines.append(f'n8n_import_stage_{suffix}{{stage="{stage}"}} {totals[slot]:.6g}')
+        typed: set[str] = set()
+        for (name, labels), value in counters:
+            metric = f"n8n_import_{name}_total"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{labels_text(labels)} {value:.6g}")
+        for name, value in gauges:
+            lines.append(f"# TYPE n8n_import_{name} gauge")
+            lines.append(f"n8n_import_{name} {value:.6g}")
+        for (name, labels), row in histograms:
+            metric = f"n8n_import_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0.0
+            for bound, count in zip([*LATENCY_BUCKETS, float("inf")], row):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{metric}_bucket{labels_text([*labels, ('le', le)])} {cumulative:.6g}")
+            lines.append(f"{metric}_sum{labels_text(labels)} {row[-2]:.6g}")
+            lines.append(f"{metric}_count{labels_text(labels)} {row[-1]:.6g}")
+
+        # Written aside and renamed so the collector never reads a partial file.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+METRICS = Metrics()
+
+
+@dataclass(slots=True)
 class WorkflowCandidate:
     source: str
-    workflow: Dict
+    # None when the workflow was answered from the index or a catalog and is
+    # loaded lazily through ``ref``.
+    workflow: Optional[Dict]
+    fingerprint: Optional[str] = None
+    ref: Optional[Union["SourceRef", "CatalogRecord"]] = None
+    # Normalized name before de-duplication; with the source it forms the
+    # stable key --mode sync matches on.
+    name: Optional[str] = None
+    # Set on the placeholder emitted for a source whose bytes were already
+    # scanned this run from the named source; it carries no workflow.
+    duplicate_of: Optional[str] = None
+    # Sorted, interned node and credential types plus the node count, kept
+    # in the index and catalog so filters never need the workflow body.
+    node_types: Optional[Tuple[str, ...]] = None
+    credential_types: Optional[Tuple[str, ...]] = None
+    node_count: int = 0
+
+    @property
+    def source_key(self) -> str:
+        name = self.name
+        if name is None and self.workflow is not None:
+            name = str(self.workflow.get("name", ""))
+        return f"{self.source}\0{name or ''}"
+
+
+# On-disk fingerprint index that lets re-runs skip unchanged inputs: ``sources``
+# maps a scanned file (path, size, mtime, content hash) to the fingerprint,
+# name, node types, credential types and node count of each workflow it
+# produced (enough to filter without re-reading), ``existing`` is a snapshot of the
+# n8n instance holding the updatedAt and fingerprint last seen per workflow
+# id, and ``synced`` maps a source key to the n8n workflow --mode sync
+# manages for it.
+class ImportIndex:
+    def __init__(self, path: Path, scheme: str = "") -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending_writes = 0
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        # Rows from another engine version, dedupe mode or layout are useless.
+        scheme = f"i{INDEX_SCHEMA_VERSION}:{scheme}"
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'scheme'").fetchone()
+        if row is None or row[0] != scheme:
+            # ``synced`` survives: a stale fingerprint there only costs one
+            # extra update, while a lost mapping would duplicate the workflow.
+            self._db.execute("DROP TABLE IF EXISTS sources")
+            self._db.execute("DROP TABLE IF EXISTS existing")
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('scheme', ?)", (scheme,))
+            self._db.commit()
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                workflows TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sources_content_hash ON sources (content_hash);
+            CREATE TABLE IF NOT EXISTS existing (
+                workflow_id TEXT PRIMARY KEY,
+                updated_at TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                signature BLOB,
+                name TEXT NOT NULL DEFAULT ''
+            );
+            CREATE TABLE IF NOT EXISTS synced (
+                source_key TEXT PRIMARY KEY,
+                workflow_id TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                name TEXT NOT NULL
+            );
+            """
+        )
+
+    def _write(self, sql: str, params: Tuple) -> None:
+        with self._lock:
+            self._db.execute(sql, params)
+            self._pending_writes += 1
+            if self._pending_writes >= 500:
+                self._db.commit()
+                self._pending_writes = 0
+
+    def lookup_source(self, path: str, size: int, mtime_ns: int) -> Optional[Tuple[str, List[List]]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content_hash, workflows FROM sources WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, size, mtime_ns),
+            ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def lookup_content(self, content_hash: str) -> Optional[List[List]]:
+        # Any path with the same bytes will do: copies and moves reuse the
+        # parse of the file they were copied from.
+        with self._lock:
+            row = self._db.execute(
+                "SELECT workflows FROM sources WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record_source(
+        self, path: str, size: int, mtime_ns: int, content_hash: str, workflows: List[List]
+    ) -> None:
+        self._write(
+            "INSERT OR REPLACE INTO sources (path, size, mtime_ns, content_hash, workflows) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, content_hash, json.dumps(workflows)),
+        )
+
+    def lookup_existing(self, workflow_id: str, updated_at: str) -> Optional[Tuple[str, Optional[bytes]]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint, signature FROM existing WHERE workflow_id = ? AND updated_at = ?",
+                (workflow_id, updated_at),
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def record_existing(
+        self,
+        workflow_id: str,
+        updated_at: str,
+        fingerprint: str,
+        signature: Optional[bytes] = None,
+        name: str = "",
+    ) -> None:
+        self._write(
+            "INSERT OR REPLACE INTO existing (workflow_id, updated_at, fingerprint, signature, name) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (workflow_id, updated_at, fingerprint, signature, name),
+        )
+
+    def commit(self) -> None:
+        with self._lock:
+            self._db.commit()
+            self._pending_writes = 0
+
+    def existing_rows(self) -> List[Tuple[str, str, str, Optional[bytes]]]:
+        # (workflow_id, name, fingerprint, signature) for the whole snapshot.
+        with self._lock:
+            rows = self._db.execute("SELECT workflow_id, name, fingerprint, signature FROM existing")
+            return rows.fetchall()
+
+    def prune_existing(self, live_ids: set[str]) -> int:
+        # Drops snapshot rows for workflows that no longer exist in n8n.
+        with self._lock:
+            stale = [
+                (workflow_id,)
+                for (workflow_id,) in self._db.execute("SELECT workflow_id FROM existing")
+                if workflow_id not in live_ids
+            ]
+            self._db.executemany("DELETE FROM existing WHERE workflow_id = ?", stale)
+            self._db.commit()
+        return len(stale)
+
+    def lookup_synced(self, source_key: str) -> Optional[Tuple[str, str, str]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT workflow_id, fingerprint, name FROM synced WHERE source_key = ?", (source_key,)
+            ).fetchone()
+        return (row[0], row[1], row[2]) if row else None
+
+    def synced_keys(self) -> List[Tuple[str, str, str]]:
+        with self._lock:
+            rows = self._db.execute("SELECT source_key, workflow_id, name FROM synced ORDER BY source_key")
+            return rows.fetchall()
+
+    def record_synced(self, source_key: str, workflow_id: str, fingerprint: str, name: str) -> None:
+        self._write(
+            "INSERT OR REPLACE INTO synced (source_key, workflow_id, fingerprint, name) VALUES (?, ?, ?, ?)",
+            (source_key, workflow_id, fingerprint, name),
+        )
+
+    def forget_synced(self, source_key: str) -> None:
+        self._write("DELETE FROM synced WHERE source_key = ?", (source_key,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+
+# Append-only JSON-lines record of every workflow a run created, updated or
+# archived. Lines are flushed as they are written and fsync'd in batches, so a
+# crash loses at most the last batch; --resume replays the journal instead of
+# listing n8n again. The first line names the scheme it was written under and
+# a journal from another scheme is not replayed.
+class ImportJournal:
+    def __init__(self, path: Path, scheme: str, resume: bool = False) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.entries = self.replay(path, scheme) if resume else None
+        self._handle: IO[str] = path.open("a" if self.entries is not None else "w", encoding="utf-8")
+        if self.entries is None:
+            self._handle.write(json.dumps({"scheme": scheme, "started": int(time.time())}) + "\n")
+        elif path.stat().st_size and not path.read_bytes().endswith(b"\n"):
+            # Terminate a line torn by the crash so the next entry stays parseable.
+            self._handle.write("\n")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.sync()
+
+    @staticmethod
+    def replay(path: Path, scheme: str) -> Optional[List[Dict]]:
+        try:
+            lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
+        except OSError:
+            return None
+        if not lines:
+            return None
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            return None
+        if not isinstance(header, dict) or header.get("scheme") != scheme:
+            return None
+        entries: List[Dict] = []
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn write at the moment of the crash
+            if isinstance(entry, dict) and entry.get("id"):
+                entries.append(entry)
+        return entries
+
+    def append(self, entry: Dict) -> None:
+        self._handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._unsynced += 1
+        if self._unsynced >= JOURNAL_SYNC_RECORDS or time.monotonic() - self._last_sync >= JOURNAL_SYNC_SECONDS:
+            self.sync()
+
+    def sync(self) -> None:
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if not self._handle.closed:
+            self.sync()
+            self._handle.close()
+
+
+def _request_not_sent(exc: requests.RequestException) -> bool:
+    # True only when the connection was never established, so the server
+    # cannot have seen the request.
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.ConnectionError) and exc.args:
+        return isinstance(getattr(exc.args[0], "reason", None), NewConnectionError)
+    return False
 
 
 class N8nApiClient:
-    def __init__(self, base_url: str, api_key: str, timeout: int = 45) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        timeout: int = 45,
+        pool_size: int = 10,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+    ) -> None:
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # updatedAt of workflows this client created or updated, by id, so the
+        # caller can seed the existing-workflow snapshot without re-listing.
+        self.versions: Dict[str, str] = {}
         self.session = requests.Session()
+        # One keep-alive pool sized for the import workers sharing this session.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         self.session.headers.update(
             {
                 "accept": "application/json",
@@ -115,8 +605,41 @@ class N8nApiClient:
             raise RuntimeError(f"n8n healthcheck failed: {last_error}") from last_error
         raise RuntimeError("n8n healthcheck failed")
 
-    def list_workflows(self) -> List[Dict]:
-        workflows: List[Dict] = []
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(self.backoff_max, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        # Full jitter keeps parallel workers from retrying in lockstep.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2**attempt)))
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        attempt = 0
+        while True:
+            retry_after: Optional[str] = None
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.RequestException as exc:
+                METRICS.inc("n8n_responses", method=method, status="error")
+                # A POST that timed out or lost its connection may already be
+                # saved; sending it again would create a duplicate.
+                if attempt >= self.max_retries or not (method in IDEMPOTENT_METHODS or _request_not_sent(exc)):
+                    raise
+            else:
+                METRICS.observe("n8n_request_seconds", time.perf_counter() - started, method=method)
+                METRICS.inc("n8n_responses", method=method, status=str(response.status_code))
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+                retry_after = response.headers.get("Retry-After")
+            METRICS.inc("n8n_retries", method=method)
+            time.sleep(self._backoff_delay(attempt, retry_after))
+            attempt += 1
+
+    def iter_workflows(self) -> Iterator[Dict]:
+        # Yields rows page by page so callers can fingerprint and drop each
+        # body instead of holding the whole instance in memory.
         cursor: Optional[str] = None
 
         for _ in range(300):
@@ -124,9 +647,7 @@ class N8nApiClient:
             if cursor:
                 params["cursor"] = cursor
 
-            response = self.session.get(
-                f"{self.base_url}/api/v1/workflows", params=params, timeout=self.timeout
-            )
+            response = self._request("GET", f"{self.base_url}/api/v1/workflows", params=params)
             if response.status_code != 200:
                 raise RuntimeError(
                     f"Failed listing workflows ({response.status_code}): {response.text[:250]}"
@@ -137,13 +658,14 @@ class N8nApiClient:
             if isinstance(data, list):
                 for row in data:
                     if isinstance(row, dict):
-                        workflows.append(row)
+                        yield row
 
             cursor = payload.get("nextCursor")
             if not cursor:
                 break
 
-        return workflows
+    def list_workflows(self) -> List[Dict]:
+        return list(self.iter_workflows())
 
     def list_workflow_names(self) -> List[str]:
         names: List[str] = []
@@ -154,25 +676,152 @@ class N8nApiClient:
         return names
 
     def create_workflow(self, workflow: Dict) -> Tuple[bool, str]:
-        response = self.session.post(
-            f"{self.base_url}/api/v1/workflows",
-            data=json.dumps(workflow, ensure_ascii=True),
-            timeout=self.timeout,
-        )
+        try:
+            response = self._request(
+                "POST",
+                f"{self.base_url}/api/v1/workflows",
+                data=json.dumps(workflow, ensure_ascii=True),
+            )
+        except requests.RequestException as exc:
+            return False, f"request failed: {exc}"
         if response.status_code in (200, 201):
             payload = response.json()
             workflow_id = payload.get("id") or payload.get("data", {}).get("id")
             if workflow_id:
+                self._remember_version(str(workflow_id), payload)
                 return True, str(workflow_id)
             return True, "created"
 
         return False, f"{response.status_code}: {response.text[:300]}"
 
+    def _remember_version(self, workflow_id: str, payload: object) -> None:
+        updated_at = payload.get("updatedAt") if isinstance(payload, dict) else None
+        if isinstance(updated_at, str) and updated_at:
+            self.versions[workflow_id] = updated_at
+
+    def update_workflow(self, workflow_id: str, workflow: Dict) -> Tuple[bool, str]:
+        try:
+            response = self._request(
+                "PUT",
+                f"{self.base_url}/api/v1/workflows/{workflow_id}",
+                data=json.dumps(workflow, ensure_ascii=True),
+            )
+        except requests.RequestException as exc:
+            return False, f"request failed: {exc}"
+        if response.status_code in (200, 201):
+            self._remember_version(workflow_id, response.json())
+            return True, workflow_id
+        return False, f"{response.status_code}: {response.text[:300]}"
+
+    def node_type_descriptions(self) -> Optional[Tuple[object, object]]:
+        # The editor's static node and credential type descriptions. They are
+        # not part of the public API, so None when the instance doesn't serve them.
+        payloads = []
+        for name in ("nodes", "credentials"):
+            try:
+                response = self._request("GET", f"{self.base_url}/types/{name}.json")
+                if response.status_code != 200:
+                    return None
+                payloads.append(response.json())
+            except (requests.RequestException, ValueError):
+                return None
+        return payloads[0], payloads[1]
+
+    def archive_workflow(self, workflow_id: str) -> Tuple[bool, str]:
+        try:
+            response = self._request("POST", f"{self.base_url}/api/v1/workflows/{workflow_id}/archive")
+            if response.status_code in (200, 201):
+                return True, "archived"
+            if response.status_code in (404, 405):
+                # Instances without archiving still let us switch the workflow off.
+                response = self._request("POST", f"{self.base_url}/api/v1/workflows/{workflow_id}/deactivate")
+                if response.status_code in (200, 201):
+                    return True, "deactivated"
+        except requests.RequestException as exc:
+            return False, f"request failed: {exc}"
+        return False, f"{response.status_code}: {response.text[:300]}"
+
+
+# Node types (with the typeVersions each supports) and credential types one
+# n8n instance has installed, cached on disk for ``ttl`` seconds. Workflows
+# using anything else are rejected locally instead of costing a 400.
+class NodeTypeCatalog:
+    def __init__(self, versions: Dict[str, set[float]], credentials: Iterable[str], fetched_at: float) -> None:
+        self.versions = versions
+        self.credentials = set(credentials)
+        self.fetched_at = fetched_at
+
+    @classmethod
+    def from_descriptions(cls, nodes: object, credentials: object, fetched_at: float) -> "NodeTypeCatalog":
+        versions: Dict[str, set[float]] = {}
+        for row in nodes if isinstance(nodes, list) else []:
+            if not isinstance(row, dict) or not isinstance(row.get("name"), str):
+                continue
+            declared = row.get("version", 1)
+            # Versioned nodes list each implementation separately; merge them.
+            for version in declared if isinstance(declared, list) else [declared]:
+                number = parse_number(version)
+                if number is not None:
+                    versions.setdefault(row["name"], set()).add(number)
+        names = [
+            row["name"]
+            for row in (credentials if isinstance(credentials, list) else [])
+            if isinstance(row, dict) and isinstance(row.get("name"), str)
+        ]
+        return cls(versions, names, fetched_at)
+
+    @classmethod
+    def load(cls, client: "N8nApiClient", cache_path: Path, ttl: float) -> Optional["NodeTypeCatalog"]:
+        try:
+            cached = json.loads(cache_path.read_text(encoding="utf-8"))
+            if cached.get("url") == client.base_url and time.time() - float(cached["fetchedAt"]) < ttl:
+                versions = {name: set(found) for name, found in cached["nodes"].items()}
+                return cls(versions, cached["credentials"], float(cached["fetchedAt"]))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+        descriptions = client.node_type_descriptions()
+        if descriptions is None:
+            return None
+        catalog = cls.from_descriptions(*descriptions, fetched_at=time.time())
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "url": client.base_url,
+                    "fetchedAt": catalog.fetched_at,
+                    "nodes": {name: sorted(found) for name, found in sorted(catalog.versions.items())},
+                    "credentials": sorted(catalog.credentials),
+                }
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, cache_path)
+        return catalog
+
+    def problems(self, workflow: Dict) -> List[str]:
+        # "type:<t>", "version:<t>@<v>" or "credential:<c>" per missing item.
+        found: Dict[str, None] = {}
+        for node in workflow.get("nodes", []):
+            node_type = str(node.get("type", ""))
+            supported = self.versions.get(node_type)
+            if supported is None:
+                found[f"type:{node_type}"] = None
+            else:
+                version = parse_number(node.get("typeVersion", 1))
+                if version is not None and version not in supported:
+                    found[f"version:{node_type}@{version:g}"] = None
+            credentials = node.get("credentials")
+            for credential in credentials if isinstance(credentials, dict) else ():
+                if credential not in self.credentials:
+                    found[f"credential:{credential}"] = None
+        return list(found)
+
 
 def sanitize_name(name: str) -> str:
     cleaned = re.sub(r"\s+", " ", name.strip())
     cleaned = re.sub(r"[^\w\s\-\[\]\(\)\.:/]", "", cleaned)
-    return cleaned[:180] if cleaned else "Imported Workflow"
+    return cleaned[:MAX_NAME_LENGTH] if cleaned else "Imported Workflow"
 
 
 def is_workflow_dict(value: object) -> bool:
@@ -207,66 +856,66 @@ def parse_number(value: object) -> Optional[float]:
     return None
 
 
-def sanitize_node(node: Dict) -> Optional[Dict]:
-    cleaned = dict(node)
-    cleaned.pop("id", None)
-    cleaned = {key: value for key, value in cleaned.items() if key in ALLOWED_NODE_KEYS}
+def sanitize_position(position: object) -> List:
+    if isinstance(position, (list, tuple)) and len(position) >= 2:
+        x = parse_number(position[0])
+        y = parse_number(position[1])
+        return [x if x is not None else 0.0, y if y is not None else 0.0]
+    return [0.0, 0.0]
+
 
-    name = cleaned.get("name")
-    node_type = cleaned.get("type")
+def sanitize_node(node: Dict) -> Optional[Dict]:
+    name = node.get("name")
+    node_type = node.get("type")
     if not isinstance(name, str) or not name.strip():
         return None
     if not isinstance(node_type, str) or not node_type.strip():
         return None
 
-    parameters = cleaned.get("parameters")
-    cleaned["parameters"] = parameters if isinstance(parameters, dict) else {}
-
-    type_version = parse_number(cleaned.get("typeVersion"))
-    cleaned["typeVersion"] = type_version if type_version is not None else 1
-
-    position = cleaned.get("position")
-    if isinstance(position, (list, tuple)) and len(position) >= 2:
-        x = parse_number(position[0])
-        y = parse_number(position[1])
-        cleaned["position"] = [x if x is not None else 0, y if y is not None else 0]
-    else:
-        cleaned["position"] = [0, 0]
-
-    credentials = cleaned.get("credentials")
-    if not isinstance(credentials, dict):
-        cleaned.pop("credentials", None)
-
-    for key in ("disabled", "alwaysOutputData", "continueOnFail", "retryOnFail", "executeOnce", "notesInFlow"):
-        value = parse_bool(cleaned.get(key))
-        if value is None:
-            cleaned.pop(key, None)
-        else:
-            cleaned[key] = value
-
-    for key in ("maxTries", "waitBetweenTries"):
-        value = parse_number(cleaned.get(key))
-        if value is None:
-            cleaned.pop(key, None)
+    # Single pass over the incoming keys, building the output dict once and
+    # keeping the source key order; required keys missing from the source
+    # are appended afterwards.
+    cleaned: Dict = {}
+    for key, value in node.items():
+        if key not in ALLOWED_NODE_KEYS:
+            continue
+        if key == "parameters":
+            cleaned[key] = value if isinstance(value, dict) else {}
+        elif key == "typeVersion":
+            type_version = parse_number(value)
+            cleaned[key] = type_version if type_version is not None else 1.0
+        elif key == "position":
+            cleaned[key] = sanitize_position(value)
+        elif key == "credentials":
+            if isinstance(value, dict):
+                cleaned[key] = value
+        elif key in NODE_FLAG_KEYS:
+            flag = parse_bool(value)
+            if flag is not None:
+                cleaned[key] = flag
+        elif key in NODE_NUMBER_KEYS:
+            number = parse_number(value)
+            if number is not None:
+                cleaned[key] = number
+        elif key == "notes":
+            if value is not None:
+                cleaned[key] = value if isinstance(value, str) else str(value)
+        elif key == "onError":
+            if isinstance(value, str) and value in ALLOWED_ON_ERROR_VALUES:
+                cleaned[key] = value
+        elif key == "webhookId":
+            cleaned[key] = value if value is None or isinstance(value, str) else str(value)
         else:
             cleaned[key] = value
 
-    notes = cleaned.get("notes")
-    if notes is None:
-        cleaned.pop("notes", None)
-    elif not isinstance(notes, str):
-        cleaned["notes"] = str(notes)
-
-    on_error = cleaned.get("onError")
-    if isinstance(on_error, str) and on_error in ALLOWED_ON_ERROR_VALUES:
-        cleaned["onError"] = on_error
-    else:
-        cleaned.pop("onError", None)
-
-    webhook_id = cleaned.get("webhookId")
-    if webhook_id is not None and not isinstance(webhook_id, str):
-        cleaned["webhookId"] = str(webhook_id)
-
+    if "parameters" not in cleaned:
+        cleaned["parameters"] = {}
+    # Defaults are floats like parse_number output, so normalizing a workflow
+    # read back from n8n reproduces the same fingerprint.
+    if "typeVersion" not in cleaned:
+        cleaned["typeVersion"] = 1.0
+    if "position" not in cleaned:
+        cleaned["position"] = [0.0, 0.0]
     return cleaned
 
 
@@ -303,15 +952,9 @@ def normalize_workflow(raw: Dict, source_name: str) -> Optional[Dict]:
     if not is_workflow_dict(raw):
         return None
 
-    # Deep-copy through JSON to keep only plain JSON-safe values.
-    workflow = json.loads(json.dumps(raw))
-
-    name = workflow.get("name")
-    if not isinstance(name, str) or not name.strip():
-        name = Path(source_name).stem
-    clean_name = sanitize_name(str(name))
-
-    raw_nodes = workflow.get("nodes", [])
+    # Inputs come straight from json.loads, so they are already plain JSON
+    # values; the sanitized output is built from them without a deep copy.
+    raw_nodes = raw.get("nodes", [])
     if not isinstance(raw_nodes, list) or len(raw_nodes) == 0:
         return None
 
@@ -324,22 +967,21 @@ def normalize_workflow(raw: Dict, source_name: str) -> Optional[Dict]:
     if not nodes:
         return None
 
-    connections = workflow.get("connections", {})
+    name = raw.get("name")
+    if not isinstance(name, str) or not name.strip():
+        name = Path(source_name).stem
+
+    connections = raw.get("connections", {})
     if not isinstance(connections, dict):
         connections = {}
 
-    settings = sanitize_settings(workflow.get("settings"))
-
-    normalized = {
-        "name": clean_name,
+    return {
+        "name": sanitize_name(str(name)),
         "nodes": nodes,
         "connections": connections,
-        "settings": settings,
+        "settings": sanitize_settings(raw.get("settings")),
     }
 
-    # Guardrail in case incoming payload mutated keys unexpectedly.
-    return {k: v for k, v in normalized.items() if k in ALLOWED_WORKFLOW_KEYS}
-
 
 def extract_workflows_from_json(payload: object, source_name: str) -> List[Dict]:
     results: List[Dict] = []
@@ -374,195 +1016,1880 @@ def extract_workflows_from_json(payload: object, source_name: str) -> List[Dict]
     return results
 
 
-def json_fingerprint(workflow: Dict) -> str:
-    reduced = dict(workflow)
-    reduced.pop("name", None)
-    reduced.pop("active", None)
-    canonical = json.dumps(reduced, sort_keys=True, ensure_ascii=True, separators=(",", ":"))
-    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+def _canonical_bytes(value: object) -> bytes:
+    return _FINGERPRINT_ENCODER.encode(value).encode("utf-8", "surrogatepass")
 
 
-def load_json_file(path: Path) -> Optional[object]:
+def _structural_node(node: Dict) -> Dict:
+    reduced = {key: value for key, value in node.items() if key != "position"}
+    type_version = reduced.get("typeVersion")
+    if isinstance(type_version, int) and not isinstance(type_version, bool):
+        reduced["typeVersion"] = float(type_version)
+    return reduced
+
+
+def _structural_connections(connections: object) -> object:
+    # Output slots are positional, but the order of links inside one slot is not.
+    if not isinstance(connections, dict):
+        return connections
+    canonical: Dict = {}
+    for source, outputs in connections.items():
+        if not isinstance(outputs, dict):
+            canonical[source] = outputs
+            continue
+        canonical[source] = {
+            kind: [
+                sorted(slot, key=_canonical_bytes) if isinstance(slot, list) and len(slot) > 1 else slot
+                for slot in slots
+            ]
+            if isinstance(slots, list)
+            else slots
+            for kind, slots in outputs.items()
+        }
+    return canonical
+
+
+def json_fingerprint(workflow: Dict, mode: str = "exact") -> str:
+    # The name never takes part in the fingerprint. Nodes are encoded and fed
+    # to the hash in fixed-size slices instead of one string for the whole
+    # workflow; the first slice shares an encoder call with settings and
+    # connections so typical workflows cost a single pass.
+    settings = workflow.get("settings", {})
+    connections = workflow.get("connections", {})
+    nodes = [node for node in workflow.get("nodes", []) if isinstance(node, dict)]
+    if mode == "structural":
+        # Canvas positions and node order are cosmetic; n8n node names are
+        # unique within a workflow, so sorting by name gives a stable order.
+        nodes = sorted((_structural_node(node) for node in nodes), key=lambda node: str(node.get("name")))
+        connections = _structural_connections(connections)
+
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(_canonical_bytes([settings, connections, nodes[:FINGERPRINT_NODE_SLICE]]))
+    for start in range(FINGERPRINT_NODE_SLICE, len(nodes), FINGERPRINT_NODE_SLICE):
+        hasher.update(_canonical_bytes(nodes[start : start + FINGERPRINT_NODE_SLICE]))
+    return hasher.hexdigest()
+
+
+def workflow_features(workflow: Dict) -> set[str]:
+    # Shape only: node types (with multiplicity), parameter keys per type and
+    # type-to-type edges. Values, names and layout are deliberately ignored so
+    # lightly edited forks of a template land close together.
+    features: set[str] = set()
+    counts: Dict[str, int] = {}
+
+    def add_counted(feature: str) -> None:
+        counts[feature] = counts.get(feature, 0) + 1
+        features.add(f"{feature}#{counts[feature]}")
+
+    node_types: Dict[str, str] = {}
+    for node in workflow.get("nodes", []):
+        if not isinstance(node, dict):
+            continue
+        node_type = str(node.get("type", ""))
+        node_types[str(node.get("name", ""))] = node_type
+        add_counted(f"type:{node_type}")
+        parameters = node.get("parameters")
+        if isinstance(parameters, dict):
+            for key in parameters:
+                features.add(f"param:{node_type}:{key}")
+
+    connections = workflow.get("connections")
+    if isinstance(connections, dict):
+        for source, outputs in connections.items():
+            if not isinstance(outputs, dict):
+                continue
+            source_type = node_types.get(str(source), "?")
+            for slots in outputs.values():
+                if not isinstance(slots, list):
+                    continue
+                for slot in slots:
+                    if not isinstance(slot, list):
+                        continue
+                    for link in slot:
+                        if isinstance(link, dict):
+                            add_counted(f"edge:{source_type}>{node_types.get(str(link.get('node')), '?')}")
+    return features
+
+
+def _minhash_column(feature: str) -> bytes:
+    column = _MINHASH_COLUMNS.get(feature)
+    if column is None:
+        # One SHAKE-128 read yields a value for every permutation at once.
+        column = hashlib.shake_128(feature.encode("utf-8", "surrogatepass")).digest(8 * MINHASH_PERMUTATIONS)
+        if len(_MINHASH_COLUMNS) >= MINHASH_COLUMN_CACHE_SIZE:
+            _MINHASH_COLUMNS.clear()
+        _MINHASH_COLUMNS[feature] = column
+    return column
+
+
+def minhash_signature(features: Iterable[str]) -> array:
+    # Features repeat heavily across a template corpus, so columns are cached
+    # and the column-wise minimum is taken in C via map/zip.
+    columns = [array("Q", _minhash_column(feature)) for feature in features]
+    if not columns:
+        return array("Q", bytes(8 * MINHASH_PERMUTATIONS))
+    return array("Q", map(min, zip(*columns)))
+
+
+class NearDuplicateIndex:
+    # MinHash signatures bucketed by LSH bands: a query only compares against
+    # signatures sharing at least one band, so lookups stay roughly constant
+    # as the index grows instead of scanning every earlier workflow.
+    def __init__(self, threshold: float, permutations: int = MINHASH_PERMUTATIONS) -> None:
+        self.threshold = threshold
+        self.permutations = permutations
+        self.rows = self._pick_rows(threshold, permutations)
+        self.bands = permutations // self.rows
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(self.bands)]
+        self._signatures: List[array] = []
+        self.labels: List[Dict] = []
+
+    @staticmethod
+    def _pick_rows(threshold: float, permutations: int) -> int:
+        # Widest band whose S-curve midpoint (1/b)^(1/r) stays below the
+        # threshold, so recall is favoured and exact similarity filters the rest.
+        best = 1
+        for rows in range(1, permutations + 1):
+            bands = permutations // rows
+            if (1 / bands) ** (1 / rows) <= threshold:
+                best = rows
+        return best
+
+    def _band_keys(self, signature: array) -> Iterator[Tuple[int, ...]]:
+        for band in range(self.bands):
+            yield tuple(signature[band * self.rows : (band + 1) * self.rows])
+
+    def query(self, signature: array) -> Optional[Tuple[int, float]]:
+        seen: set[int] = set()
+        best: Optional[Tuple[int, float]] = None
+        for band, key in enumerate(self._band_keys(signature)):
+            for item in self._buckets[band].get(key, ()):
+                if item in seen:
+                    continue
+                seen.add(item)
+                other = self._signatures[item]
+                similarity = sum(map(operator.eq, signature, other)) / self.permutations
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (item, similarity)
+        return best
+
+    def add(self, signature: array, label: Dict) -> int:
+        item = len(self._signatures)
+        self._signatures.append(signature)
+        self.labels.append(label)
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(key, []).append(item)
+        return item
+
+
+def parse_json_bytes(data: bytes) -> Optional[object]:
     try:
-        text = path.read_text(encoding="utf-8")
+        text = data.decode("utf-8")
     except UnicodeDecodeError:
-        text = path.read_text(encoding="latin-1")
+        text = data.decode("latin-1")
+
+    try:
+        return json.loads(text)
     except Exception:
         return None
 
+
+class JsonStream:
+    # Pull parser over a byte stream for the few container levels the
+    # extractor cares about: values inside them are decoded one at a time with
+    # raw_decode, so only the current value and one read chunk are in memory.
+    def __init__(self, stream: IO[bytes], chunk_size: int = STREAM_CHUNK_BYTES) -> None:
+        self._stream = stream
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> bool:
+        if self._eof:
+            return False
+        chunk = self._stream.read(size)
+        if not chunk:
+            self._eof = True
+        text = self._decoder.decode(chunk, final=self._eof)
+        self._buffer = self._buffer[self._pos :] + text
+        self._pos = 0
+        return bool(chunk) or bool(text)
+
+    def peek(self) -> Optional[str]:
+        while True:
+            self._pos = _JSON_WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill(self._chunk_size):
+                return None
+
+    def advance(self) -> None:
+        self._pos += 1
+
+    def value(self) -> object:
+        self.peek()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = _STREAM_DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            else:
+                # A value ending exactly at the buffer edge may be a number
+                # cut in half; only trust it once more input confirms the end.
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            # Read ahead geometrically so one big value is re-decoded only
+            # O(log size) times.
+            self._fill(size)
+            size *= 2
+
+    def items(self) -> Iterator[object]:
+        # Streams the elements of the array starting at the current position.
+        self.advance()
+        if self.peek() == "]":
+            self.advance()
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.advance()
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"expected ',' or ']' in array, found {separator!r}")
+
+
+def iter_json_stream_workflows(
+    stream: IO[bytes], source_name: str, chunk_size: int = STREAM_CHUNK_BYTES
+) -> Iterator[Dict]:
+    # Same shapes as extract_workflows_from_json, but top-level arrays and a
+    # top-level "workflows" list are yielded element by element. The rest of a
+    # top-level object is collected and handled once the object closes, so a
+    # bundle that is itself a workflow comes after its "workflows" entries.
+    parser = JsonStream(stream, chunk_size)
     try:
-        return json.loads(text)
+        first = parser.peek()
+        if first == "[":
+            for entry in parser.items():
+                if isinstance(entry, dict):
+                    normalized = normalize_workflow(entry, source_name)
+                    if normalized:
+                        yield normalized
+            return
+        if first != "{":
+            return
+        parser.advance()
+        rest: Dict[str, object] = {}
+        while parser.peek() not in ("}", None):
+            key = parser.value()
+            if not isinstance(key, str) or parser.peek() != ":":
+                return
+            parser.advance()
+            if key == "workflows" and parser.peek() == "[":
+                for entry in parser.items():
+                    if isinstance(entry, dict):
+                        normalized = normalize_workflow(entry, source_name)
+                        if normalized:
+                            yield normalized
+            else:
+                rest[key] = parser.value()
+            if parser.peek() == ",":
+                parser.advance()
+        yield from extract_workflows_from_json(rest, source_name)
+    except ValueError:
+        # Truncated or malformed bundle: keep what was already yielded.
+        return
+
+
+def looks_like_workflow(data: bytes) -> bool:
+    # Every shape extract_workflows_from_json accepts has both keys somewhere
+    # in the raw bytes, so a substring scan rejects most other JSON for free.
+    return b'"nodes"' in data and b'"connections"' in data
+
+
+def load_json_file(path: Path) -> Optional[object]:
+    try:
+        data = path.read_bytes()
     except Exception:
         return None
+    return parse_json_bytes(data)
+
+
+@dataclass(frozen=True)
+class SourceRef:
+    path: Path
+    # Entry name inside the ``path`` ZIP archive; None for plain files.
+    member: Optional[str] = None
+    size: int = -1
+    # mtime_ns for files, CRC-32 for archive entries; -1 when not yet known.
+    stamp: int = -1
+
+    @property
+    def label(self) -> str:
+        return f"{self.path}:{self.member}" if self.member is not None else str(self.path)
+
+
+class SourceReader:
+    # Keeps the most recently used archive open, since discovery yields all
+    # entries of one archive back to back.
+    def __init__(self) -> None:
+        self._archive_path: Optional[Path] = None
+        self._archive: Optional[zipfile.ZipFile] = None
+
+    def _archive_for(self, path: Path) -> zipfile.ZipFile:
+        if self._archive is None or self._archive_path != path:
+            self.close()
+            self._archive = zipfile.ZipFile(path, "r")
+            self._archive_path = path
+        return self._archive
+
+    def read(self, ref: SourceRef) -> bytes:
+        if ref.member is None:
+            return ref.path.read_bytes()
+        return self._archive_for(ref.path).read(ref.member)
+
+    def open(self, ref: SourceRef) -> IO[bytes]:
+        if ref.member is None:
+            return ref.path.open("rb")
+        return self._archive_for(ref.path).open(ref.member)
+
+    def close(self) -> None:
+        if self._archive is not None:
+            self._archive.close()
+        self._archive = None
+        self._archive_path = None
 
 
-def discover_local_json_files(roots: Iterable[Path]) -> Iterable[Path]:
-    for root in roots:
-        if not root.exists():
-            continue
-        for path in root.rglob("*.json"):
-            if any(part in IGNORE_DIR_NAMES for part in path.parts):
-                continue
-            yield path
+@dataclass
+class PendingSource:
+    ref: SourceRef
+    size: int
+    stamp: int
+    content_hash: str
+    data: bytes
 
 
-def extract_zip_to_folder(zip_path: Path, destination: Path) -> Optional[Path]:
-    if not zip_path.exists():
+def _first_source(seen_content: Optional[Dict[str, str]], content_hash: str, source: str) -> Optional[str]:
+    # The source that first produced these bytes, or None if this one did.
+    if seen_content is None:
         return None
-    target = destination / f"zip_{zip_path.stem}"
-    target.mkdir(parents=True, exist_ok=True)
+    first = seen_content.setdefault(content_hash, source)
+    return first if first != source else None
+
+
+def workflow_profile(workflow: Dict) -> Tuple[Tuple[str, ...], Tuple[str, ...], int]:
+    # (node types, credential types, node count), types sorted and interned.
+    nodes = [node for node in workflow.get("nodes", []) if isinstance(node, dict)]
+    node_types = {sys.intern(str(node.get("type", ""))) for node in nodes}
+    credential_types = {
+        sys.intern(str(key))
+        for node in nodes
+        if isinstance(node.get("credentials"), dict)
+        for key in node["credentials"]
+    }
+    return tuple(sorted(node_types)), tuple(sorted(credential_types)), len(nodes)
+
+
+def parsed_candidate(source: str, workflow: Dict, fingerprint: str, ref: Optional[SourceRef]) -> WorkflowCandidate:
+    node_types, credential_types, node_count = workflow_profile(workflow)
+    return WorkflowCandidate(
+        source=source,
+        workflow=workflow,
+        fingerprint=fingerprint,
+        ref=ref,
+        name=workflow["name"],
+        node_types=node_types,
+        credential_types=credential_types,
+        node_count=node_count,
+    )
+
+
+def indexed_candidates(source: str, ref: SourceRef, cached: List[List]) -> List[WorkflowCandidate]:
+    # Index rows are [fingerprint, name, node types, credential types, node count].
+    return [
+        WorkflowCandidate(
+            source=source,
+            workflow=None,
+            fingerprint=fingerprint,
+            ref=ref,
+            name=name,
+            node_types=tuple(sys.intern(node_type) for node_type in node_types),
+            credential_types=tuple(sys.intern(credential) for credential in credential_types),
+            node_count=node_count,
+        )
+        for fingerprint, name, node_types, credential_types, node_count in cached
+    ]
+
+
+def read_json_source(
+    ref: SourceRef,
+    index: Optional[ImportIndex] = None,
+    reader: Optional[SourceReader] = None,
+    seen_content: Optional[Dict[str, str]] = None,
+) -> Union[List[WorkflowCandidate], PendingSource]:
+    # ``seen_content`` maps each content hash scanned this run to its first
+    # source, so identical bytes reached through another path, zip or repo
+    # pack are parsed once and only reported as a duplicate source.
+    source = ref.label
+    size, stamp = ref.size, ref.stamp
+    if ref.member is None and (size < 0 or stamp < 0):
+        try:
+            stat = ref.path.stat()
+        except OSError:
+            return []
+        size, stamp = stat.st_size, stat.st_mtime_ns
+
+    if index is not None:
+        hit = index.lookup_source(source, size, stamp)
+        if hit is not None:
+            METRICS.inc("index_hits", kind="stat")
+            content_hash, cached = hit
+            first = _first_source(seen_content, content_hash, source)
+            if first is not None:
+                return [WorkflowCandidate(source=source, workflow=None, ref=ref, duplicate_of=first)]
+            return indexed_candidates(source, ref, cached)
+
     try:
-        with zipfile.ZipFile(zip_path, "r") as archive:
-            archive.extractall(target)
-        return target
+        with METRICS.stage("read"):
+            data = reader.read(ref) if reader is not None else SourceReader().read(ref)
     except Exception:
+        METRICS.inc("read_errors")
+        return []
+    METRICS.inc("files_read")
+    METRICS.inc("bytes_read", len(data))
+    content_hash = hashlib.sha1(data).hexdigest()
+    if not looks_like_workflow(data):
+        # package.json, tsconfig and friends: remembered as empty, never parsed.
+        METRICS.inc("files_sniffed_out")
+        if index is not None:
+            index.record_source(source, size, stamp, content_hash, [])
+        return []
+    first = _first_source(seen_content, content_hash, source)
+    if first is not None:
+        # Not recorded in the index: if the first copy disappears, this one
+        # must be parsed for real next time.
+        METRICS.inc("duplicate_sources")
+        return [WorkflowCandidate(source=source, workflow=None, ref=ref, duplicate_of=first)]
+
+    if index is not None:
+        # Touched, copied or moved but not edited: reuse the stored parse.
+        cached = index.lookup_content(content_hash)
+        if cached is not None:
+            METRICS.inc("index_hits", kind="content")
+            index.record_source(source, size, stamp, content_hash, cached)
+            return indexed_candidates(source, ref, cached)
+
+    return PendingSource(ref, size, stamp, content_hash, data)
+
+
+def parse_json_source(source: str, data: bytes, dedupe_mode: str = "exact") -> List[Tuple[Dict, str]]:
+    with METRICS.stage("parse"):
+        payload = parse_json_bytes(data)
+    if payload is None:
+        return []
+    with METRICS.stage("normalize"):
+        workflows = extract_workflows_from_json(payload, source)
+    with METRICS.stage("fingerprint"):
+        return [(workflow, json_fingerprint(workflow, dedupe_mode)) for workflow in workflows]
+
+
+def parse_json_batch(batch: List[Tuple[str, bytes]], dedupe_mode: str = "exact") -> List[List[Tuple[Dict, str]]]:
+    # Process-pool entry point: only bytes go in and normalized workflows come out.
+    return [parse_json_source(source, data, dedupe_mode) for source, data in batch]
+
+
+def finish_json_source(
+    pending: PendingSource, parsed: List[Tuple[Dict, str]], index: Optional[ImportIndex] = None
+) -> List[WorkflowCandidate]:
+    source = pending.ref.label
+    candidates = [parsed_candidate(source, workflow, fingerprint, pending.ref) for workflow, fingerprint in parsed]
+    if index is not None:
+        index.record_source(
+            source,
+            pending.size,
+            pending.stamp,
+            pending.content_hash,
+            [
+                [c.fingerprint, c.name, c.node_types, c.credential_types, c.node_count]
+                for c in candidates
+            ],
+        )
+    return candidates
+
+
+def is_large_source(ref: SourceRef) -> bool:
+    size = ref.size
+    if size < 0 and ref.member is None:
+        try:
+            size = ref.path.stat().st_size
+        except OSError:
+            return False
+    return size > STREAM_PARSE_BYTES
+
+
+def stream_json_source(
+    ref: SourceRef, reader: Optional[SourceReader] = None, dedupe_mode: str = "exact"
+) -> Iterator[WorkflowCandidate]:
+    # Large bundles are parsed incrementally on every run and bypass the
+    # source index: a cached hit would have to re-read the whole bundle to
+    # load each candidate body.
+    source = ref.label
+    try:
+        stream = (reader or SourceReader()).open(ref)
+    except Exception:
+        METRICS.inc("read_errors")
+        return
+    METRICS.inc("files_streamed")
+    with stream:
+        for workflow in iter_json_stream_workflows(stream, source):
+            yield parsed_candidate(source, workflow, json_fingerprint(workflow, dedupe_mode), ref)
+
+
+def scan_json_source(
+    ref: SourceRef,
+    index: Optional[ImportIndex] = None,
+    reader: Optional[SourceReader] = None,
+    dedupe_mode: str = "exact",
+    seen_content: Optional[Dict[str, str]] = None,
+) -> List[WorkflowCandidate]:
+    if is_large_source(ref):
+        return list(stream_json_source(ref, reader, dedupe_mode))
+    read = read_json_source(ref, index, reader, seen_content)
+    if isinstance(read, list):
+        return read
+    return finish_json_source(read, parse_json_source(read.ref.label, read.data, dedupe_mode), index)
+
+
+def scan_json_file(
+    path: Path, index: Optional[ImportIndex] = None, dedupe_mode: str = "exact"
+) -> List[WorkflowCandidate]:
+    return scan_json_source(SourceRef(path), index, dedupe_mode=dedupe_mode)
+
+
+class SourceWorkflowCache:
+    # Index hits carry only a fingerprint. The first one loaded from a source
+    # parses the whole source once and its siblings are served from that
+    # parse; candidates of one source arrive together, so a few recent
+    # sources suffice. One reader keeps the current archive open throughout.
+    def __init__(self, size: int = SOURCE_CACHE_SIZE) -> None:
+        self.size = size
+        self.reader = SourceReader()
+        self._parsed: "OrderedDict[str, Dict[str, Dict]]" = OrderedDict()
+
+    def load(self, ref: SourceRef, source: str, fingerprint: Optional[str], dedupe_mode: str) -> Optional[Dict]:
+        parsed = self._parsed.get(ref.label)
+        if parsed is None:
+            try:
+                data = self.reader.read(ref)
+            except Exception:
+                return None
+            parsed = {}
+            for workflow, workflow_fingerprint in parse_json_source(source, data, dedupe_mode):
+                parsed.setdefault(workflow_fingerprint, workflow)
+            self._parsed[ref.label] = parsed
+            if len(self._parsed) > self.size:
+                self._parsed.popitem(last=False)
+        else:
+            self._parsed.move_to_end(ref.label)
+        return parsed.get(fingerprint) if fingerprint is not None else None
+
+    def close(self) -> None:
+        self._parsed.clear()
+        self.reader.close()
+
+
+def load_candidate_workflow(
+    candidate: WorkflowCandidate, dedupe_mode: str = "exact", cache: Optional[SourceWorkflowCache] = None
+) -> Optional[Dict]:
+    if candidate.workflow is not None:
+        return candidate.workflow
+    if candidate.ref is None:
         return None
+    if isinstance(candidate.ref, CatalogRecord):
+        return candidate.ref.load()
+    if cache is not None:
+        return cache.load(candidate.ref, candidate.source, candidate.fingerprint, dedupe_mode)
+    single = SourceWorkflowCache(size=1)
+    try:
+        return single.load(candidate.ref, candidate.source, candidate.fingerprint, dedupe_mode)
+    finally:
+        single.close()
 
 
-def discover_workflows_from_large_zip(zip_path: Path) -> List[WorkflowCandidate]:
-    candidates: List[WorkflowCandidate] = []
-    if not zip_path.exists():
-        return candidates
+@dataclass
+class CandidateFilter:
+    # --include-node-type / --exclude-node-type / --max-nodes / --name-regex,
+    # answered from a candidate's indexed profile. A type pattern matches a
+    # node or credential type by full name or by the part after the last dot,
+    # ignoring case ("telegram" matches "n8n-nodes-base.telegram"); every
+    # include pattern must match and no exclude pattern may.
+    include_types: Tuple[str, ...] = ()
+    exclude_types: Tuple[str, ...] = ()
+    max_nodes: Optional[int] = None
+    name_pattern: Optional[re.Pattern[str]] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.include_types or self.exclude_types) or (
+            self.max_nodes is not None or self.name_pattern is not None
+        )
+
+    @staticmethod
+    def type_matches(node_type: str, pattern: str) -> bool:
+        node_type = node_type.lower()
+        return node_type == pattern or node_type.rsplit(".", 1)[-1] == pattern
 
+    def matches(self, candidate: WorkflowCandidate, check_types: bool = True) -> bool:
+        if self.max_nodes is not None and candidate.node_count > self.max_nodes:
+            return False
+        if self.name_pattern is not None and not self.name_pattern.search(candidate.name or ""):
+            return False
+        if check_types and (self.include_types or self.exclude_types):
+            types = (*(candidate.node_types or ()), *(candidate.credential_types or ()))
+            if not all(any(self.type_matches(t, pattern) for t in types) for pattern in self.include_types):
+                return False
+            if any(self.type_matches(t, pattern) for pattern in self.exclude_types for t in types):
+                return False
+        return True
+
+
+def select_candidates(
+    candidates: Iterable[WorkflowCandidate], selection: CandidateFilter, stats: Dict[str, int]
+) -> Iterator[WorkflowCandidate]:
+    for candidate in candidates:
+        if candidate.duplicate_of is None and not selection.matches(candidate):
+            stats["filtered"] += 1
+            continue
+        yield candidate
+
+
+# Packed candidate catalog: the normalized workflows of one scan in a single
+# file, so a later run (--from-catalog) can import without discovery or
+# parsing. Layout: magic, then per workflow a 4-byte big-endian length and a
+# zlib-compressed JSON record, then a compressed JSON index, then a footer of
+# index offset, index length and magic again. The index holds the source and
+# type string tables plus one entry per candidate: [offset, length,
+# fingerprint, name, source id, [node type ids], [credential type ids], node
+# count, duplicate-of source id or -1]. Duplicate placeholders have offset -1
+# and no record.
+class CatalogWriter:
+    def __init__(self, path: Path, scheme: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.scheme = scheme
+        # Written aside and renamed on close, so an interrupted scan never
+        # leaves a catalog that looks complete.
+        self._tmp_path = path.with_name(f"{path.name}.part")
+        self._handle = self._tmp_path.open("wb")
+        self._handle.write(CATALOG_MAGIC)
+        self._offset = len(CATALOG_MAGIC)
+        self._sources: Dict[str, int] = {}
+        self._types: Dict[str, int] = {}
+        self._entries: List[List[object]] = []
+        self._workflow_cache = SourceWorkflowCache()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _intern(self, table: Dict[str, int], value: str) -> int:
+        return table.setdefault(value, len(table))
+
+    def add(self, candidate: WorkflowCandidate, dedupe_mode: str = "exact") -> None:
+        source_id = self._intern(self._sources, candidate.source)
+        if candidate.duplicate_of is not None:
+            duplicate_id = self._intern(self._sources, candidate.duplicate_of)
+            self._entries.append([-1, 0, "", "", source_id, [], [], 0, duplicate_id])
+            return
+        workflow = load_candidate_workflow(candidate, dedupe_mode, self._workflow_cache)
+        if workflow is None:
+            return
+        # Key order is kept as normalized; only the fingerprint sorts keys.
+        data = json.dumps(workflow, ensure_ascii=False, separators=(",", ":")).encode("utf-8", "surrogatepass")
+        record = zlib.compress(data, CATALOG_COMPRESS_LEVEL)
+        self._handle.write(struct.pack(">I", len(record)))
+        self._handle.write(record)
+        offset = self._offset + 4
+        self._offset = offset + len(record)
+        node_types, credential_types, node_count = workflow_profile(workflow)
+        types = [self._intern(self._types, node_type) for node_type in node_types]
+        credentials = [self._intern(self._types, credential) for credential in credential_types]
+        fingerprint = candidate.fingerprint or json_fingerprint(workflow, dedupe_mode)
+        name = candidate.name if candidate.name is not None else str(workflow.get("name", ""))
+        self._entries.append([offset, len(record), fingerprint, name, source_id, types, credentials, node_count, -1])
+
+    def close(self, complete: bool = True) -> None:
+        if self._handle.closed:
+            return
+        self._workflow_cache.close()
+        if not complete:
+            self._handle.close()
+            self._tmp_path.unlink(missing_ok=True)
+            return
+        index = {
+            "scheme": self.scheme,
+            "sources": list(self._sources),
+            "types": list(self._types),
+            "entries": self._entries,
+        }
+        data = zlib.compress(json.dumps(index, separators=(",", ":")).encode("utf-8"), CATALOG_COMPRESS_LEVEL)
+        self._handle.write(data)
+        self._handle.write(struct.pack(">QI", self._offset, len(data)) + CATALOG_MAGIC)
+        self._handle.close()
+        os.replace(self._tmp_path, self.path)
+
+
+def write_catalog(
+    candidates: Iterable[WorkflowCandidate], writer: CatalogWriter, dedupe_mode: str = "exact"
+) -> Iterator[WorkflowCandidate]:
+    # Packs candidates as they pass; the catalog is only published once the
+    # stream has been consumed to the end.
+    complete = False
     try:
-        with zipfile.ZipFile(zip_path, "r") as archive:
-            for entry in archive.infolist():
-                name_lower = entry.filename.lower()
-                if not name_lower.endswith(".json"):
-                    continue
-                if "workflow" not in name_lower and "template" not in name_lower and ".n8n" not in name_lower:
-                    continue
-                if entry.file_size > 10_000_000:
+        for candidate in candidates:
+            writer.add(candidate, dedupe_mode)
+            yield candidate
+        complete = True
+    finally:
+        writer.close(complete)
+
+
+class CatalogRecord:
+    __slots__ = ("catalog", "offset", "length")
+
+    def __init__(self, catalog: "CandidateCatalog", offset: int, length: int) -> None:
+        self.catalog = catalog
+        self.offset = offset
+        self.length = length
+
+    def load(self) -> Dict:
+        return self.catalog.load(self.offset, self.length)
+
+
+class CandidateCatalog:
+    # Read side of CatalogWriter. The file is mapped, not read: only the
+    # index is decoded up front and each workflow is inflated when imported.
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._handle = path.open("rb")
+        try:
+            self._map = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._handle.close()
+            raise ValueError(f"{path} is not a workflow catalog")
+        footer = struct.calcsize(">QI") + len(CATALOG_MAGIC)
+        if (
+            len(self._map) < len(CATALOG_MAGIC) + footer
+            or self._map[: len(CATALOG_MAGIC)] != CATALOG_MAGIC
+            or self._map[-len(CATALOG_MAGIC) :] != CATALOG_MAGIC
+        ):
+            self.close()
+            raise ValueError(f"{path} is not a workflow catalog")
+        offset, length = struct.unpack(">QI", self._map[-footer : -len(CATALOG_MAGIC)])
+        try:
+            index = json.loads(zlib.decompress(self._map[offset : offset + length]))
+            self.scheme: str = index["scheme"]
+            self.sources = [sys.intern(source) for source in index["sources"]]
+            self.types = [sys.intern(node_type) for node_type in index["types"]]
+            self.entries: List[List] = index["entries"]
+        except (zlib.error, KeyError, TypeError, ValueError):
+            # A truncated or overwritten index surfaces as a bad catalog, the
+            # same as a wrong magic, instead of a traceback from main.
+            self.close()
+            raise ValueError(f"{path} is not a workflow catalog")
+        self._postings: Optional[Dict[int, array]] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def load(self, offset: int, length: int) -> Dict:
+        return json.loads(zlib.decompress(self._map[offset : offset + length]).decode("utf-8", "surrogatepass"))
+
+    def __iter__(self) -> Iterator[WorkflowCandidate]:
+        return self.select()
+
+    def postings(self) -> Dict[int, array]:
+        # Inverted index: type id (node or credential) -> ordinals of the
+        # entries using it, built once from the catalog index.
+        if self._postings is None:
+            postings: Dict[int, array] = {}
+            for ordinal, entry in enumerate(self.entries):
+                for type_id in (*entry[5], *entry[6]):
+                    postings.setdefault(type_id, array("I")).append(ordinal)
+            self._postings = postings
+        return self._postings
+
+    def select(self, selection: Optional["CandidateFilter"] = None) -> Iterator[WorkflowCandidate]:
+        # With type filters only the posting lists are walked; entries are
+        # never inflated to decide, and duplicate placeholders always pass.
+        sources, types = self.sources, self.types
+        ordinals: Iterable[int] = range(len(self.entries))
+        if selection is not None and (selection.include_types or selection.exclude_types):
+            postings = self.postings()
+
+            def using(pattern: str) -> set[int]:
+                matched: set[int] = set()
+                for type_id, node_type in enumerate(types):
+                    if selection.type_matches(node_type, pattern):
+                        matched.update(postings.get(type_id, ()))
+                return matched
+
+            keep = {ordinal for ordinal, entry in enumerate(self.entries) if entry[0] < 0}
+            chosen: Optional[set[int]] = None
+            for pattern in selection.include_types:
+                chosen = using(pattern) if chosen is None else chosen & using(pattern)
+            if chosen is None:
+                chosen = set(range(len(self.entries)))
+            for pattern in selection.exclude_types:
+                chosen -= using(pattern)
+            ordinals = sorted(chosen | keep)
+        for ordinal in ordinals:
+            offset, length, fingerprint, name, source_id, type_ids, credential_ids, node_count, duplicate_id = (
+                self.entries[ordinal]
+            )
+            if offset < 0:
+                yield WorkflowCandidate(
+                    source=sources[source_id], workflow=None, duplicate_of=sources[duplicate_id]
+                )
+                continue
+            candidate = WorkflowCandidate(
+                source=sources[source_id],
+                workflow=None,
+                fingerprint=fingerprint,
+                ref=CatalogRecord(self, offset, length),
+                name=name,
+                node_types=tuple(types[type_id] for type_id in type_ids),
+                credential_types=tuple(types[type_id] for type_id in credential_ids),
+                node_count=node_count,
+            )
+            if selection is None or selection.matches(candidate, check_types=False):
+                yield candidate
+
+    def close(self) -> None:
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+        self._handle.close()
+
+
+def _walk_root(root: Path, suffixes: set[str]) -> Iterator[Tuple[Path, int, int]]:
+    # Depth-first over os.scandir: ignored directories are never opened, the
+    # stat from the directory entry is kept for the index lookup, and entries
+    # are sorted per directory so the order is the same on every filesystem.
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as listing:
+                entries = sorted(listing, key=operator.attrgetter("name"))
+        except OSError:
+            continue
+        subdirectories: List[str] = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in IGNORE_DIR_NAMES:
+                        subdirectories.append(entry.path)
                     continue
-                try:
-                    raw = archive.read(entry).decode("utf-8", errors="ignore")
-                    payload = json.loads(raw)
-                except Exception:
+                if os.path.splitext(entry.name)[1].lower() not in suffixes or not entry.is_file():
                     continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            yield Path(entry.path), stat.st_size, stat.st_mtime_ns
+        stack.extend(reversed(subdirectories))
 
-                for workflow in extract_workflows_from_json(payload, entry.filename):
-                    candidates.append(
-                        WorkflowCandidate(source=f"{zip_path.name}:{entry.filename}", workflow=workflow)
-                    )
-    except Exception:
-        return candidates
 
-    return candidates
+def _unique_roots(roots: Iterable[Path]) -> List[Path]:
+    # A root inside another root (or listed twice) would be walked twice.
+    resolved = {root.resolve(): root for root in roots if root.is_dir()}
+    return [root for path, root in resolved.items() if not any(parent in resolved for parent in path.parents)]
 
 
-def download_and_extract_repo(repo: str, destination: Path) -> Optional[Path]:
-    destination.mkdir(parents=True, exist_ok=True)
-    for branch in ("main", "master"):
-        url = f"https://codeload.github.com/{repo}/zip/refs/heads/{branch}"
-        try:
-            response = requests.get(url, timeout=120)
-        except Exception:
+def iter_local_files(roots: Iterable[Path], include_archives: bool = False) -> Iterator[Tuple[Path, int, int]]:
+    suffixes = {".json", ".zip"} if include_archives else {".json"}
+    # Each root is walked on its own thread, up to WALK_QUEUE_SIZE entries
+    # ahead of the consumer; results are still yielded root by root.
+    walkers = [run_stage(_walk_root(root, suffixes), maxsize=WALK_QUEUE_SIZE) for root in _unique_roots(roots)]
+    for walker in walkers:
+        yield from walker
+
+
+def discover_local_json_files(roots: Iterable[Path], include_archives: bool = False) -> Iterable[Path]:
+    for path, _, _ in iter_local_files(roots, include_archives):
+        yield path
+
+
+def discover_archive_entries(zip_path: Path) -> Iterator[SourceRef]:
+    # Entries are filtered on the central directory alone; nothing is
+    # decompressed or written to disk until the scan reads a kept entry.
+    try:
+        with zipfile.ZipFile(zip_path, "r") as archive:
+            entries = archive.infolist()
+    except Exception:
+        return
+    for entry in entries:
+        if entry.is_dir() or not entry.filename.lower().endswith(".json"):
             continue
-        if response.status_code != 200:
+        if any(part in IGNORE_DIR_NAMES for part in entry.filename.split("/")[:-1]):
             continue
+        yield SourceRef(zip_path, entry.filename, entry.file_size, entry.CRC)
+
+
+@dataclass
+class SourceTask:
+    # One independently scheduled input: a local root, a local ZIP or an
+    # online repo. ``prepare`` is the step discovery depends on (a download)
+    # and returns the archive to list, or None and a status to skip the task.
+    name: str
+    kind: str
+    path: Optional[Path] = None
+    prepare: Optional[Callable[[], Tuple[Optional[Path], str]]] = None
+    timing: Dict[str, object] = field(default_factory=dict)
+    # Start of every source label the task yields, so synced sources can be
+    # traced back to the task that should have produced them.
+    prefix: str = ""
+
+    @property
+    def scanned(self) -> bool:
+        # discoveredSeconds is only set once the whole listing was handed on.
+        return self.timing.get("status") in SCANNED_SOURCE_STATUSES and "discoveredSeconds" in self.timing
+
+
+def build_source_tasks(
+    roots: Iterable[Path],
+    archives: Iterable[Path] = (),
+    repos: Iterable[str] = (),
+    cache_dir: Path = DEFAULT_DOWNLOAD_CACHE,
+    download_workers: int = 4,
+) -> List[SourceTask]:
+    roots = list(roots)
+    tasks = [SourceTask(str(root), "root", root, prefix=os.path.join(str(root), "")) for root in _unique_roots(roots)]
+    # Missing inputs still get a task: it reports the status and keeps
+    # --archive-missing away from what they synced on earlier runs.
+    tasks.extend(
+        SourceTask(str(root), "root", root, prefix=os.path.join(str(root), "")) for root in roots if not root.is_dir()
+    )
+    tasks.extend(SourceTask(str(path), "zip", path, prefix=f"{path}:") for path in archives)
+    slots = threading.BoundedSemaphore(max(1, download_workers))
+
+    def fetch(repo: str) -> Callable[[], Tuple[Optional[Path], str]]:
+        def prepare() -> Tuple[Optional[Path], str]:
+            with slots:
+                return download_repo_archive(repo, cache_dir)
+
+        return prepare
+
+    tasks.extend(
+        SourceTask(repo, "repo", prepare=fetch(repo), prefix=f"{cache_dir / repo.replace('/', '__')}__")
+        for repo in dict.fromkeys(repos)
+    )
+    return tasks
+
+
+def _run_source_task(task: SourceTask, started: float) -> Iterator[SourceRef]:
+    timing = task.timing
+    timing.update(source=task.name, kind=task.kind, status="ok")
+    path = task.path
+    if path is not None and not (path.is_dir() if task.kind == "root" else path.is_file()):
+        path, timing["status"] = None, "missing"
+        print(f"[scan] skipped {task.name} (missing)")
+    if task.prepare is not None:
+        begin = time.perf_counter()
+        path, timing["status"] = task.prepare()
+        timing["prepareSeconds"] = round(time.perf_counter() - begin, 3)
+        if task.kind == "repo":
+            print(f"[online] {'fetched' if path else 'skipped'} {task.name} ({timing['status']})")
+    if path is not None:
+        if task.kind == "root":
+            for file_path, size, mtime_ns in _walk_root(path, {".json", ".zip"}):
+                if file_path.suffix.lower() == ".zip":
+                    yield from discover_archive_entries(file_path)
+                else:
+                    yield SourceRef(file_path, size=size, stamp=mtime_ns)
+        else:
+            yield from discover_archive_entries(path)
+    timing["discoveredSeconds"] = round(time.perf_counter() - started, 3)
+
+
+def schedule_sources(tasks: List[SourceTask], maxsize: int = WALK_QUEUE_SIZE) -> Iterator[SourceRef]:
+    # Every task starts on its own thread right away, so downloads, ZIP
+    # listings and directory walks overlap and a task only waits on its own
+    # prepare step. Refs are still handed on task by task: candidate order,
+    # and with it dedupe and naming, stays the same as a serial run.
+    started = time.perf_counter()
+    streams = [run_stage(_run_source_task(task, started), maxsize) for task in tasks]
+    # A ZIP found under a root and also passed explicitly is scanned once.
+    claimed: set[Path] = set()
+    for task, stream in zip(tasks, streams):
+        files = 0
+        waited = 0.0
+        archive: Optional[Path] = None
+        skip = False
+        mark = time.perf_counter()
+        for ref in stream:
+            waited += time.perf_counter() - mark
+            if ref.member is not None and ref.path != archive:
+                archive = ref.path
+                resolved = archive.resolve()
+                skip = resolved in claimed
+                claimed.add(resolved)
+            if ref.member is None or not skip:
+                files += 1
+                yield ref
+            mark = time.perf_counter()
+        task.timing.update(files=files, waitSeconds=round(waited, 3))
+        task.timing["doneSeconds"] = round(time.perf_counter() - started, 3)
+        METRICS.event("source", **task.timing)
+
+
+def discover_sources(roots: Iterable[Path], archives: Iterable[Path] = ()) -> Iterator[SourceRef]:
+    return schedule_sources(build_source_tasks(roots, archives))
+
+
+def iter_source_candidates(
+    refs: Iterable[SourceRef],
+    stats: Dict[str, int],
+    index: Optional[ImportIndex] = None,
+    workers: int = 0,
+    dedupe_mode: str = "exact",
+) -> Iterator[WorkflowCandidate]:
+    reader = SourceReader()
+    seen_content: Dict[str, str] = {}
+    try:
+        if workers <= 1:
+            for ref in refs:
+                stats["files"] += 1
+                if is_large_source(ref):
+                    scanned: Iterable[WorkflowCandidate] = stream_json_source(ref, reader, dedupe_mode)
+                else:
+                    scanned = scan_json_source(ref, index, reader, dedupe_mode, seen_content)
+                for candidate in scanned:
+                    stats["candidates"] += candidate.duplicate_of is None
+                    yield candidate
+            return
+        yield from _iter_source_candidates_pooled(refs, stats, index, workers, reader, dedupe_mode, seen_content)
+    finally:
+        reader.close()
+
+
+def _iter_source_candidates_pooled(
+    refs: Iterable[SourceRef],
+    stats: Dict[str, int],
+    index: Optional[ImportIndex],
+    workers: int,
+    reader: SourceReader,
+    dedupe_mode: str,
+    seen_content: Dict[str, str],
+) -> Iterator[WorkflowCandidate]:
+    # Sources are read and checked against the index here, then parsed in
+    # chunks on a process pool. Chunks are drained in submission order so
+    # candidate order, and with it dedupe and naming, matches the serial scan.
+    Chunk = List[Union[List[WorkflowCandidate], PendingSource]]
+    in_flight: Deque[Tuple[Chunk, Future]] = deque()
+
+    def drain(chunk: Chunk, future: Future) -> Iterator[WorkflowCandidate]:
+        # Pool workers keep no metrics; the parent sees parsing as wait time.
+        with METRICS.stage("parse_wait"):
+            parsed = iter(future.result())
+        for item in chunk:
+            ready = item if isinstance(item, list) else finish_json_source(item, next(parsed), index)
+            for candidate in ready:
+                stats["candidates"] += candidate.duplicate_of is None
+                yield candidate
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+
+        def submit(chunk: Chunk) -> None:
+            batch = [(item.ref.label, item.data) for item in chunk if isinstance(item, PendingSource)]
+            in_flight.append((chunk, executor.submit(parse_json_batch, batch, dedupe_mode)))
+
+        chunk: Chunk = []
+        chunk_bytes = 0
+        for ref in refs:
+            stats["files"] += 1
+            if is_large_source(ref):
+                # Streamed here in order, after everything queued before it.
+                if chunk:
+                    submit(chunk)
+                    chunk, chunk_bytes = [], 0
+                while in_flight:
+                    yield from drain(*in_flight.popleft())
+                for candidate in stream_json_source(ref, reader, dedupe_mode):
+                    stats["candidates"] += 1
+                    yield candidate
+                continue
+            item = read_json_source(ref, index, reader, seen_content)
+            chunk.append(item)
+            if isinstance(item, PendingSource):
+                chunk_bytes += len(item.data)
+            if len(chunk) >= PARSE_CHUNK_FILES or chunk_bytes >= PARSE_CHUNK_BYTES:
+                submit(chunk)
+                chunk, chunk_bytes = [], 0
+            while len(in_flight) > workers * 2:
+                yield from drain(*in_flight.popleft())
+        if chunk:
+            submit(chunk)
+        while in_flight:
+            yield from drain(*in_flight.popleft())
+
+
+def timed_iter(items: Iterable[T], stage: str) -> Iterator[T]:
+    # Charges the time spent producing each item (e.g. walking directories)
+    # to ``stage``; a plain pass-through when metrics are off.
+    if not METRICS.enabled:
+        yield from items
+        return
+    iterator = iter(items)
+    while True:
+        with METRICS.stage(stage):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def run_stage(items: Iterable[T], maxsize: int) -> Iterator[T]:
+    # The producer thread blocks once ``maxsize`` items are waiting, so a slow
+    # consumer caps memory instead of letting the whole stage materialize. It
+    # starts on the call rather than on the first next(), so several stages
+    # created up front run ahead concurrently.
+    buffer: "queue.Queue[object]" = queue.Queue(maxsize=max(1, maxsize))
+    done = object()
+    failure: List[BaseException] = []
+
+    def produce() -> None:
+        try:
+            for item in items:
+                buffer.put(item)
+        except BaseException as exc:  # pragma: no cover - surfaced to consumer
+            failure.append(exc)
+        finally:
+            buffer.put(done)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    def consume() -> Iterator[T]:
+        while True:
+            item = buffer.get()
+            if item is done:
+                break
+            yield item  # type: ignore[misc]
+        if failure:
+            raise failure[0]
+
+    return consume()
+
+
+class FanOutLane(Generic[T]):
+    # Consumer side of fan_out. close() tells the producer to stop feeding
+    # this lane; the owner calls it however the lane ends, including when
+    # it fails before reading anything.
+    def __init__(
+        self, buffer: "queue.Queue[object]", done: object, failure: List[BaseException], stop: Optional[threading.Event]
+    ) -> None:
+        self.buffer = buffer
+        self.done = done
+        self.failure = failure
+        self.stop = stop
+        self.closed = False
+
+    def __iter__(self) -> "FanOutLane[T]":
+        return self
+
+    def __next__(self) -> T:
+        while not self.closed:
+            if self.stop is not None and self.stop.is_set():
+                self.closed = True
+                raise KeyboardInterrupt
+            try:
+                item = self.buffer.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is self.done:
+                self.closed = True
+                if self.failure:
+                    raise self.failure[0]
+                break
+            return item  # type: ignore[return-value]
+        raise StopIteration
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def fan_out(
+    items: Iterable[T], lanes: int, maxsize: int, stop: Optional[threading.Event] = None
+) -> List[FanOutLane[T]]:
+    # Like run_stage, but every item goes to each of ``lanes`` consumers. The
+    # slowest lane paces the producer; a closed lane is dropped rather than
+    # stalling the others. Setting ``stop`` makes every lane raise
+    # KeyboardInterrupt, so each one winds down as on Ctrl-C.
+    done = object()
+    failure: List[BaseException] = []
+    consumers: List[FanOutLane[T]] = [
+        FanOutLane(queue.Queue(maxsize=max(1, maxsize)), done, failure, stop) for _ in range(lanes)
+    ]
+
+    def put(lane: FanOutLane[T], item: object) -> None:
+        while not lane.closed:
+            try:
+                lane.buffer.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
 
-        zip_file = destination / f"{repo.replace('/', '__')}__{branch}.zip"
-        zip_file.write_bytes(response.content)
+    def produce() -> None:
+        try:
+            for item in items:
+                for lane in consumers:
+                    put(lane, item)
+        except BaseException as exc:  # pragma: no cover - surfaced to consumers
+            failure.append(exc)
+        finally:
+            for lane in consumers:
+                put(lane, done)
+
+    threading.Thread(target=produce, daemon=True).start()
+    return consumers
+
+
+def download_repo_archive(repo: str, cache_dir: Path) -> Tuple[Optional[Path], str]:
+    with METRICS.stage("download"):
+        archive, status = _download_repo_archive(repo, cache_dir)
+    METRICS.inc("downloads", status=status)
+    METRICS.event("download", repo=repo, status=status)
+    return archive, status
+
+
+def _download_repo_archive(repo: str, cache_dir: Path) -> Tuple[Optional[Path], str]:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    stem = repo.replace("/", "__")
+    branches = ["main", "master"]
+    # Try the branch that worked last time first so master-only repos don't
+    # pay for a 404 on every run.
+    if (cache_dir / f"{stem}__master.zip").exists():
+        branches.reverse()
+
+    for branch in branches:
+        zip_file = cache_dir / f"{stem}__{branch}.zip"
+        etag_file = cache_dir / f"{stem}__{branch}.etag"
+        headers: Dict[str, str] = {}
+        if zip_file.exists() and etag_file.exists():
+            headers["If-None-Match"] = etag_file.read_text(encoding="utf-8").strip()
 
-        extract_dir = destination / f"{repo.replace('/', '__')}__{branch}"
-        extract_dir.mkdir(parents=True, exist_ok=True)
+        url = f"https://codeload.github.com/{repo}/zip/refs/heads/{branch}"
+        part_file = cache_dir / f"{stem}__{branch}.zip.part"
         try:
-            with zipfile.ZipFile(zip_file, "r") as archive:
-                archive.extractall(extract_dir)
-            return extract_dir
+            with requests.get(url, headers=headers, timeout=120, stream=True) as response:
+                if response.status_code == 304 and zip_file.exists():
+                    return zip_file, "not modified"
+                if response.status_code != 200:
+                    # A rate limit or outage must not drop a repo we already
+                    # have; only a branch without a cached archive moves on.
+                    if zip_file.exists():
+                        return zip_file, "cached (revalidation failed)"
+                    continue
+                with part_file.open("wb") as handle:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                        handle.write(chunk)
+                        METRICS.inc("download_bytes", len(chunk))
+                etag = response.headers.get("ETag", "")
         except Exception:
+            part_file.unlink(missing_ok=True)
+            # Offline or DNS trouble: the archive from the last run is still
+            # better than dropping the repo altogether.
+            if zip_file.exists():
+                return zip_file, "cached (revalidation failed)"
             continue
-    return None
+
+        if not zipfile.is_zipfile(part_file):
+            part_file.unlink(missing_ok=True)
+            continue
+        os.replace(part_file, zip_file)
+        if etag:
+            etag_file.write_text(etag, encoding="utf-8")
+        else:
+            etag_file.unlink(missing_ok=True)
+        return zip_file, "downloaded"
+    return None, "download failed"
+
+
+class NameAllocator:
+    # Remembers the next free "[n]" suffix per sanitized base name, so a pack
+    # with hundreds of "My workflow" copies costs O(1) per name instead of
+    # re-probing [2], [3], ... from the start every time.
+    def __init__(self, used_names: Optional[set[str]] = None) -> None:
+        self.used_names = used_names if used_names is not None else set()
+        self._next_suffix: Dict[str, int] = {}
+        self._sanitized: Dict[str, Tuple[str, bool]] = {}
+
+    def _sanitize(self, base_name: str) -> Tuple[str, bool]:
+        cached = self._sanitized.get(base_name)
+        if cached is None:
+            name = sanitize_name(base_name)
+            # A name that sanitizes to itself stays unchanged by sanitize_name
+            # once " [n]" is appended, apart from the length cap.
+            cached = (name, sanitize_name(name) == name)
+            if len(self._sanitized) >= NAME_CACHE_SIZE:
+                self._sanitized.clear()
+            self._sanitized[base_name] = cached
+        return cached
+
+    def _suffixed(self, name: str, stable: bool, suffix: int) -> str:
+        tag = f" [{suffix}]"
+        if len(name) + len(tag) > MAX_NAME_LENGTH:
+            # Trim the base instead of the suffix; cutting the suffix off could
+            # make every probe collide.
+            return sanitize_name(f"{name[: MAX_NAME_LENGTH - len(tag)]}{tag}")
+        return f"{name}{tag}" if stable else sanitize_name(f"{name}{tag}")
+
+    def allocate(self, base_name: str) -> str:
+        name, stable = self._sanitize(base_name)
+        if name not in self.used_names:
+            self.used_names.add(name)
+            return name
+        # Names are never released, so every suffix below the remembered one
+        # is still taken and probing can resume where it stopped.
+        suffix = self._next_suffix.get(name, 2)
+        candidate = self._suffixed(name, stable, suffix)
+        while candidate in self.used_names:
+            suffix += 1
+            candidate = self._suffixed(name, stable, suffix)
+        self._next_suffix[name] = suffix + 1
+        self.used_names.add(candidate)
+        return candidate
 
 
 def make_unique_name(base_name: str, used_names: set[str]) -> str:
-    name = sanitize_name(base_name)
-    if name not in used_names:
-        used_names.add(name)
-        return name
-    suffix = 2
-    while True:
-        candidate = sanitize_name(f"{name} [{suffix}]")
-        if candidate not in used_names:
-            used_names.add(candidate)
-            return candidate
-        suffix += 1
+    return NameAllocator(used_names).allocate(base_name)
+
+
+@dataclass
+class ExistingWorkflows:
+    names: set[str]
+    fingerprints: set[str]
+    # workflow id -> current name, and fingerprint -> first workflow id with it
+    by_id: Dict[str, str]
+    by_fingerprint: Dict[str, str]
+    fingerprinted: int = 0
+
+    def add(self, workflow_id: str, name: str, fingerprint: str) -> None:
+        if name.strip():
+            self.names.add(name.strip())
+        self.fingerprints.add(fingerprint)
+        self.by_id[workflow_id] = name
+        self.by_fingerprint.setdefault(fingerprint, workflow_id)
+
+
+def existing_from_index(
+    fingerprint_index: ImportIndex, near_duplicates: Optional[NearDuplicateIndex] = None
+) -> ExistingWorkflows:
+    # The snapshot as of the last listing, used by --resume instead of n8n.
+    existing = ExistingWorkflows(set(), set(), {}, {})
+    for workflow_id, name, fingerprint, signature in fingerprint_index.existing_rows():
+        existing.add(workflow_id, name, fingerprint)
+        if near_duplicates is not None and signature is not None:
+            near_duplicates.add(array("Q", signature), {"name": name, "workflowId": workflow_id})
+    return existing
+
+
+def snapshot_existing_workflows(
+    client: N8nApiClient,
+    fingerprint_index: Optional[ImportIndex] = None,
+    dedupe_mode: str = "exact",
+    near_duplicates: Optional[NearDuplicateIndex] = None,
+) -> ExistingWorkflows:
+    # The public API has no updated-since filter or field projection, so every
+    # page is still listed; rows are consumed as they arrive (the next page is
+    # fetched meanwhile) and only ids whose updatedAt moved since the snapshot
+    # in the index are normalized and fingerprinted again.
+    existing = ExistingWorkflows(set(), set(), {}, {})
+    for row in run_stage(client.iter_workflows(), maxsize=500):
+        workflow_id = str(row.get("id") or "")
+        updated_at = str(row.get("updatedAt") or "")
+        name = row.get("name")
+        if isinstance(name, str) and name.strip():
+            existing.names.add(name.strip())
+        label = {"name": row.get("name", ""), "workflowId": workflow_id}
+        if workflow_id:
+            existing.by_id[workflow_id] = str(name or "")
+        fingerprint: Optional[str] = None
+        if fingerprint_index is not None and workflow_id and updated_at:
+            cached = fingerprint_index.lookup_existing(workflow_id, updated_at)
+            if cached and (near_duplicates is None or cached[1] is not None):
+                fingerprint = cached[0]
+                if near_duplicates is not None and cached[1] is not None:
+                    near_duplicates.add(array("Q", cached[1]), label)
+        if fingerprint is None:
+            normalized_existing = normalize_workflow(row, source_name="existing")
+            if not normalized_existing:
+                continue
+            existing.fingerprinted += 1
+            fingerprint = json_fingerprint(normalized_existing, dedupe_mode)
+            signature: Optional[array] = None
+            if near_duplicates is not None:
+                signature = minhash_signature(workflow_features(normalized_existing))
+                near_duplicates.add(signature, label)
+            if fingerprint_index is not None and workflow_id and updated_at:
+                fingerprint_index.record_existing(
+                    workflow_id,
+                    updated_at,
+                    fingerprint,
+                    signature.tobytes() if signature is not None else None,
+                    str(name or ""),
+                )
+        existing.fingerprints.add(fingerprint)
+        if workflow_id:
+            existing.by_fingerprint.setdefault(fingerprint, workflow_id)
+    if fingerprint_index is not None:
+        fingerprint_index.prune_existing(set(existing.by_id))
+        fingerprint_index.commit()
+    return existing
+
+
+# One JSON line per candidate (and per archived workflow) with its outcome,
+# written as the run goes so memory stays flat, nothing is truncated and the
+# file can be tailed; the summary next to it only carries the counts.
+class ImportReport:
+    def __init__(self, path: Path, append: bool = False) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.counts: Dict[str, int] = dict.fromkeys(OUTCOME_FIELDS, 0)
+        self._handle: IO[str] = path.open("a" if append else "w", encoding="utf-8", buffering=1)
+
+    def row(self, outcome: str, **fields: object) -> None:
+        self.counts[outcome] += 1
+        self._handle.write(json.dumps({"outcome": outcome, **fields}, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+def _timed_call(call: Callable[..., T], *args: object) -> Tuple[T, float]:
+    started = time.perf_counter()
+    result = call(*args)
+    return result, time.perf_counter() - started
+
+
+def target_slugs(urls: List[str]) -> List[str]:
+    # File-name-safe label per target URL, e.g. "prod-example-com-5678".
+    slugs: List[str] = []
+    for url in urls:
+        parsed = urlparse(url)
+        slug = re.sub(r"[^a-z0-9]+", "-", f"{parsed.netloc}{parsed.path}".lower()).strip("-") or "n8n"
+        base, suffix = slug, 2
+        while slug in slugs:
+            slug, suffix = f"{base}-{suffix}", suffix + 1
+        slugs.append(slug)
+    return slugs
+
+
+def target_path(path: Path, slug: str) -> Path:
+    return path.with_name(f"{path.stem}.{slug}{path.suffix}")
+
+
+@dataclass
+class ImportTarget:
+    # One n8n instance a run imports into: its own client and report, plus
+    # the journal and index holding its existing-workflow and sync state.
+    url: str
+    client: N8nApiClient
+    report_path: Path
+    journal_path: Path
+    index_path: Path
+    index: Optional[ImportIndex] = None
+    journal: Optional[ImportJournal] = None
+    node_catalog: Optional[NodeTypeCatalog] = None
+    quarantine_dir: Optional[Path] = None
+    summary: Optional[Dict] = None
+
+
+@dataclass
+class PendingImport:
+    index: int
+    candidate: WorkflowCandidate
+    workflow: Dict
+    future: Future
+    action: str = "create"
+    source_key: str = ""
+    fingerprint: str = ""
+    signature: Optional[array] = None
 
 
 def import_candidates(
-    client: N8nApiClient, candidates: List[WorkflowCandidate], report_path: Path
+    client: N8nApiClient,
+    candidates: Iterable[WorkflowCandidate],
+    report_path: Path,
+    concurrency: int = 1,
+    fingerprint_index: Optional[ImportIndex] = None,
+    dedupe_mode: str = "exact",
+    similarity_threshold: Optional[float] = None,
+    mode: str = "create",
+    archive_missing: bool = False,
+    journal: Optional[ImportJournal] = None,
+    rows_path: Optional[Path] = None,
+    sources: Optional[List[Dict[str, object]]] = None,
+    node_catalog: Optional[NodeTypeCatalog] = None,
+    quarantine_dir: Optional[Path] = None,
+    source_tasks: Optional[List[SourceTask]] = None,
 ) -> Dict:
-    existing_workflows = client.list_workflows()
-    existing_names = {
-        row.get("name").strip()
-        for row in existing_workflows
-        if isinstance(row, dict) and isinstance(row.get("name"), str) and row.get("name").strip()
-    }
-    used_names = set(existing_names)
-    seen_hashes: set[str] = set()
-    for row in existing_workflows:
-        if not isinstance(row, dict):
-            continue
-        normalized_existing = normalize_workflow(row, source_name="existing")
-        if normalized_existing:
-            seen_hashes.add(json_fingerprint(normalized_existing))
-
-    imported = 0
-    skipped_duplicates = 0
-    failed: List[Dict] = []
-    imported_rows: List[Dict] = []
-
-    for index, candidate in enumerate(candidates, start=1):
-        workflow = dict(candidate.workflow)
-        fingerprint = json_fingerprint(workflow)
-        if fingerprint in seen_hashes:
-            skipped_duplicates += 1
-            continue
-        seen_hashes.add(fingerprint)
-
-        workflow["name"] = make_unique_name(str(workflow.get("name", "Imported Workflow")), used_names)
-        ok, details = client.create_workflow(workflow)
-        if ok:
-            imported += 1
-            imported_rows.append(
-                {
-                    "index": index,
-                    "name": workflow["name"],
-                    "source": candidate.source,
-                    "workflowId": details,
-                }
-            )
+    sync = mode == "sync"
+    if sync and fingerprint_index is None:
+        raise ValueError("--mode sync needs the fingerprint index to remember which workflow each source owns")
+
+    near_duplicates = NearDuplicateIndex(similarity_threshold) if similarity_threshold else None
+    resumed = journal is not None and journal.entries is not None
+    with METRICS.stage("existing_snapshot"):
+        if resumed and fingerprint_index is not None:
+            existing = existing_from_index(fingerprint_index, near_duplicates)
         else:
-            failed.append(
+            existing = snapshot_existing_workflows(client, fingerprint_index, dedupe_mode, near_duplicates)
+    if resumed:
+        # Whatever the interrupted run saved counts as existing, and its sync
+        # mappings are restored in case the index lost its last batch.
+        for entry in journal.entries:
+            workflow_id, name, fingerprint = str(entry["id"]), str(entry.get("name", "")), str(entry.get("fp", ""))
+            if entry.get("op") == "archive":
+                existing.by_id.pop(workflow_id, None)
+                if sync and entry.get("key"):
+                    fingerprint_index.forget_synced(entry["key"])
+                continue
+            existing.add(workflow_id, name, fingerprint)
+            if sync and entry.get("key"):
+                fingerprint_index.record_synced(entry["key"], workflow_id, fingerprint, name)
+    names = NameAllocator(set(existing.names))
+    seen_hashes = set(existing.fingerprints)
+    existing_by_id = existing.by_id
+    existing_by_fingerprint = existing.by_fingerprint
+
+    total_candidates = 0
+    report = ImportReport(
+        rows_path or report_path.with_name(f"{report_path.stem}.rows.jsonl"), append=resumed
+    )
+    counts = report.counts
+    seen_keys: set[str] = set()
+    key_counts: Dict[str, int] = {}
+    duplicate_sources: set[str] = set()
+    rejected_by_type: Dict[str, int] = {}
+    workflow_cache = SourceWorkflowCache()
+
+    def reject(index: int, candidate: WorkflowCandidate, workflow: Dict, fingerprint: str, problems: List[str]) -> None:
+        # Pre-flight failure: nothing is sent. Quarantined workflows are kept
+        # as files so they can be fixed or imported once the nodes exist.
+        for problem in problems:
+            rejected_by_type[problem] = rejected_by_type.get(problem, 0) + 1
+        row: Dict[str, object] = {
+            "index": index,
+            "name": workflow.get("name", ""),
+            "source": candidate.source,
+            "fingerprint": fingerprint,
+            "problems": problems,
+        }
+        if quarantine_dir is not None:
+            quarantine_dir.mkdir(parents=True, exist_ok=True)
+            slug = re.sub(r"[^\w.-]+", "_", str(workflow.get("name", "")))[:80]
+            path = quarantine_dir / f"{index:06d}-{slug}.json"
+            path.write_text(
+                json.dumps({"source": candidate.source, "problems": problems, "workflow": workflow}, indent=2),
+                encoding="utf-8",
+            )
+            row["quarantined"] = str(path)
+        report.row("rejected", **row)
+
+    def record(pending: PendingImport) -> None:
+        with METRICS.stage("import_wait"):
+            (ok, details), seconds = pending.future.result()
+        row = {
+            "index": pending.index,
+            "name": pending.workflow.get("name", ""),
+            "source": pending.candidate.source,
+            "fingerprint": pending.fingerprint,
+            "latencyMs": round(seconds * 1000, 1),
+        }
+        if not ok:
+            report.row("failed", error=details, **row)
+            return
+        version = client.versions.pop(details, None)
+        if fingerprint_index is not None and version:
+            # What we just saved is already fingerprinted; the next run's
+            # snapshot then matches it on (id, updatedAt).
+            signature = pending.signature
+            if near_duplicates is not None and signature is None:
+                signature = minhash_signature(workflow_features(pending.workflow))
+            fingerprint_index.record_existing(
+                details,
+                version,
+                pending.fingerprint,
+                signature.tobytes() if signature is not None else None,
+                row["name"],
+            )
+        if journal is not None:
+            journal.append(
                 {
-                    "index": index,
-                    "name": workflow.get("name", ""),
-                    "source": candidate.source,
-                    "error": details,
+                    "op": pending.action,
+                    "id": details,
+                    "name": row["name"],
+                    "fp": pending.fingerprint,
+                    "source": row["source"],
+                    "key": pending.source_key,
                 }
             )
+        report.row("updated" if pending.action == "update" else "imported", workflowId=details, **row)
+        if sync and details != "created":
+            fingerprint_index.record_synced(pending.source_key, details, pending.fingerprint, row["name"])
+
+    # Dedupe and naming stay on this thread in candidate order; only the POSTs
+    # run in parallel, and results are drained in submission order so the
+    # report is identical to a serial run.
+    concurrency = max(1, concurrency)
+    in_flight: Deque[PendingImport] = deque()
+    interrupted = False
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            index = 0
+            for candidate in candidates:
+                if candidate.duplicate_of is not None:
+                    # Same bytes as a source already scanned: nothing to parse,
+                    # only the extra location to report.
+                    report.row("duplicateSources", source=candidate.source, duplicateOf=candidate.duplicate_of)
+                    duplicate_sources.add(candidate.source)
+                    continue
+                index += 1
+                total_candidates = index
+                fingerprint = candidate.fingerprint or json_fingerprint(candidate.workflow, dedupe_mode)
+                action = "create"
+                source_key = ""
+                synced: Optional[Tuple[str, str, str]] = None
+                if sync:
+                    # Source path + original name; repeats inside one source are
+                    # told apart by their position among same-named workflows.
+                    source_key = candidate.source_key
+                    occurrence = key_counts.get(source_key, 0) + 1
+                    key_counts[source_key] = occurrence
+                    if occurrence > 1:
+                        source_key = f"{source_key}\0{occurrence}"
+                    seen_keys.add(source_key)
+                    synced = fingerprint_index.lookup_synced(source_key)
+                    if synced is not None and synced[0] not in existing_by_id:
+                        synced = None  # deleted in n8n since the last sync; recreate it
+                    if synced is not None and synced[1] == fingerprint:
+                        seen_hashes.add(fingerprint)
+                        report.row(
+                            "unchanged",
+                            index=index,
+                            name=synced[2],
+                            source=candidate.source,
+                            fingerprint=fingerprint,
+                            workflowId=synced[0],
+                        )
+                        continue
+                    if synced is None and fingerprint in existing_by_fingerprint:
+                        # Imported before sync tracked it: adopt instead of duplicating.
+                        workflow_id = existing_by_fingerprint[fingerprint]
+                        fingerprint_index.record_synced(
+                            source_key, workflow_id, fingerprint, existing_by_id[workflow_id]
+                        )
+                        report.row(
+                            "adopted",
+                            index=index,
+                            name=existing_by_id[workflow_id],
+                            source=candidate.source,
+                            fingerprint=fingerprint,
+                            workflowId=workflow_id,
+                        )
+                        continue
+                    if synced is not None:
+                        action = "update"
+
+                if action == "create":
+                    if fingerprint in seen_hashes:
+                        report.row(
+                            "skippedDuplicates",
+                            index=index,
+                            name=candidate.name,
+                            source=candidate.source,
+                            fingerprint=fingerprint,
+                            duplicateOf=existing_by_fingerprint.get(fingerprint),
+                        )
+                        continue
+                seen_hashes.add(fingerprint)
+
+                source_workflow = load_candidate_workflow(candidate, dedupe_mode, workflow_cache)
+                if source_workflow is None:
+                    report.row(
+                        "failed",
+                        index=index,
+                        name=candidate.name,
+                        source=candidate.source,
+                        fingerprint=fingerprint,
+                        error="source changed or unreadable since it was indexed",
+                    )
+                    continue
+                workflow = dict(source_workflow)
+                if node_catalog is not None:
+                    problems = node_catalog.problems(workflow)
+                    if problems:
+                        reject(index, candidate, workflow, fingerprint, problems)
+                        continue
+
+                signature: Optional[array] = None
+                if synced is not None:
+                    # Updates keep the name the workflow was created under.
+                    workflow["name"] = synced[2]
+                    future = executor.submit(_timed_call, client.update_workflow, synced[0], workflow)
+                else:
+                    if near_duplicates is not None:
+                        signature = minhash_signature(workflow_features(workflow))
+                        match = near_duplicates.query(signature)
+                        if match is not None:
+                            report.row(
+                                "skippedNearDuplicates",
+                                index=index,
+                                name=workflow.get("name", ""),
+                                source=candidate.source,
+                                fingerprint=fingerprint,
+                                similarity=round(match[1], 3),
+                                nearDuplicateOf=near_duplicates.labels[match[0]],
+                            )
+                            continue
+
+                    workflow["name"] = names.allocate(str(workflow.get("name", "Imported Workflow")))
+                    if near_duplicates is not None and signature is not None:
+                        near_duplicates.add(signature, {"name": workflow["name"], "source": candidate.source})
+                    future = executor.submit(_timed_call, client.create_workflow, workflow)
+                in_flight.append(
+                    PendingImport(index, candidate, workflow, future, action, source_key, fingerprint, signature)
+                )
+                while len(in_flight) > concurrency * 2:
+                    record(in_flight.popleft())
+
+                if index % 100 == 0:
+                    imported, failed = counts["imported"], counts["failed"]
+                    print(f"[import] processed={index} imported={imported} failed={failed}")
+                    METRICS.event("progress", processed=index, imported=imported, failed=failed)
+
+            while in_flight:
+                record(in_flight.popleft())
+
+            if sync and archive_missing:
+                if not total_candidates:
+                    # An empty scan almost always means missing inputs, not a
+                    # deleted corpus; refuse to archive everything.
+                    print("[sync] no candidates scanned, not archiving anything")
+                else:
+                    archives = []
+                    # With the scan's tasks known, only sources under a task
+                    # that listed its contents this run can have disappeared;
+                    # a missing root or failed download archives nothing.
+                    scanned_prefixes = (
+                        tuple(task.prefix for task in source_tasks if task.scanned)
+                        if source_tasks is not None
+                        else None
+                    )
+                    synced_rows = fingerprint_index.synced_keys()
+                    live_ids = {
+                        workflow_id for source_key, workflow_id, _ in synced_rows if source_key in seen_keys
+                    }
+                    for source_key, workflow_id, name in synced_rows:
+                        # Sources skipped as byte-identical copies still exist,
+                        # and a workflow another live key maps to stays.
+                        if source_key in seen_keys or workflow_id in live_ids:
+                            continue
+                        source = source_key.split("\0", 1)[0]
+                        if source in duplicate_sources:
+                            continue
+                        if scanned_prefixes is not None and not source.startswith(scanned_prefixes):
+                            continue
+                        if workflow_id not in existing_by_id:
+                            fingerprint_index.forget_synced(source_key)
+                            continue
+                        future = executor.submit(client.archive_workflow, workflow_id)
+                        archives.append((source_key, workflow_id, name, future))
+                    for source_key, workflow_id, name, future in archives:
+                        ok, details = future.result()
+                        source = source_key.split("\0", 1)[0]
+                        if ok:
+                            fingerprint_index.forget_synced(source_key)
+                            if journal is not None:
+                                journal.append(
+                                    {"op": "archive", "id": workflow_id, "name": name, "key": source_key}
+                                )
+                            report.row(
+                                "archived", name=name, source=source, workflowId=workflow_id, action=details
+                            )
+                        else:
+                            report.row("failed", name=name, source=source, workflowId=workflow_id, error=details)
+    except BaseException:
+        # Ctrl-C or a failing scan: requests already sent finish while the
+        # executor shuts down, so record and journal them before re-raising.
+        interrupted = True
+        while in_flight:
+            try:
+                record(in_flight.popleft())
+            except Exception:
+                pass
+        raise
+    finally:
+        report.close()
+        workflow_cache.close()
+        summary = {
+            "timestamp": int(time.time()),
+            "totalCandidates": total_candidates,
+            "imported": counts["imported"],
+            "skippedDuplicates": counts["skippedDuplicates"],
+            "failed": counts["failed"],
+            "existingWorkflows": len(existing_by_id),
+            "existingFingerprinted": existing.fingerprinted,
+            "rows": str(report.path),
+        }
+        if resumed:
+            summary["resumedEntries"] = len(journal.entries)
+        if interrupted:
+            summary["interrupted"] = True
+        summary["duplicateSources"] = counts["duplicateSources"]
+        if sync:
+            summary["mode"] = mode
+            for outcome in ("updated", "unchanged", "adopted", "archived"):
+                summary[outcome] = counts[outcome]
+        if near_duplicates is not None:
+            summary["similarityThreshold"] = near_duplicates.threshold
+            summary["skippedNearDuplicates"] = counts["skippedNearDuplicates"]
+        if node_catalog is not None:
+            summary["rejected"] = counts["rejected"]
+            # Most common missing node type / version / credential first.
+            summary["rejectedByType"] = dict(sorted(rejected_by_type.items(), key=lambda item: (-item[1], item[0])))
+        if sources is not None:
+            # Per-source timing from the scheduler, in seconds since it started.
+            summary["sources"] = sources
+        for outcome in OUTCOME_FIELDS:
+            if outcome in summary:
+                METRICS.inc("workflows", summary[outcome], outcome=outcome)
+        if journal is not None:
+            journal.sync()
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
 
-        if index % 100 == 0:
-            print(f"[import] processed={index} imported={imported} failed={len(failed)}")
-
-    summary = {
-        "timestamp": int(time.time()),
-        "totalCandidates": len(candidates),
-        "imported": imported,
-        "skippedDuplicates": skipped_duplicates,
-        "failed": len(failed),
-        "failures": failed[:500],
-        "imports": imported_rows[:1000],
-    }
-    report_path.parent.mkdir(parents=True, exist_ok=True)
-    report_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
     return summary
 
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="Bulk import local + online n8n templates.")
-    parser.add_argument("--n8n-url", default="http://localhost:5678")
-    parser.add_argument("--n8n-api-key", default="")
+    parser.add_argument(
+        "--n8n-url",
+        action="append",
+        default=[],
+        help="n8n base URL (default: http://localhost:5678); repeat to import into several instances from one scan",
+    )
+    parser.add_argument(
+        "--n8n-api-key",
+        action="append",
+        default=[],
+        help="API key for each --n8n-url in the same order; a single key is used for every target",
+    )
     parser.add_argument("--report", default="scripts/n8n_import_report.json")
     parser.add_argument(
         "--local-root",
@@ -583,91 +2910,399 @@ def main() -> int:
         help="Additional online GitHub repo (owner/name) to pull templates from",
     )
     parser.add_argument("--skip-online", action="store_true")
+    parser.add_argument(
+        "--download-cache",
+        default=str(DEFAULT_DOWNLOAD_CACHE),
+        help="Directory for cached repo archives (revalidated with ETag on each run)",
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=4,
+        help="Number of repo archives downloaded in parallel",
+    )
+    parser.add_argument(
+        "--index",
+        default="",
+        help="SQLite fingerprint index path (default: next to --report)",
+    )
+    parser.add_argument("--no-index", action="store_true", help="Disable the persistent fingerprint index")
+    parser.add_argument(
+        "--dedupe-mode",
+        choices=DEDUPE_MODES,
+        default="exact",
+        help="exact: same nodes, order and layout; structural: ignore node order and canvas positions",
+    )
+    parser.add_argument(
+        "--similarity-threshold",
+        type=float,
+        default=None,
+        help="Also skip near-duplicates whose estimated Jaccard similarity (MinHash/LSH) reaches this value, e.g. 0.9",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("create", "sync"),
+        default="create",
+        help="create: only add new workflows; sync: update the workflow each source created earlier when it changed",
+    )
+    parser.add_argument(
+        "--archive-missing",
+        action="store_true",
+        help="With --mode sync, archive synced workflows whose source no longer exists",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Parse and normalize JSON files on a pool of N processes (0/1 = in-process)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of parallel create requests sent to n8n",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=4,
+        help="Retries with jittered exponential backoff on 429/5xx responses",
+    )
+    parser.add_argument(
+        "--journal",
+        default="",
+        help="Append-only progress journal path (default: next to --report)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Replay the journal of an interrupted run and skip listing n8n again",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default="",
+        help="Write per-stage timings, counters and request latency histograms here "
+        "in Prometheus text format (e.g. for the node_exporter textfile collector)",
+    )
+    parser.add_argument("--log-jsonl", default="", help="Append structured JSON-lines run events to this file")
+    parser.add_argument(
+        "--include-node-type",
+        action="append",
+        default=[],
+        help="Only import workflows using this node or credential type (e.g. telegram or "
+        "n8n-nodes-base.telegram); repeat to require several",
+    )
+    parser.add_argument(
+        "--exclude-node-type",
+        action="append",
+        default=[],
+        help="Skip workflows using this node or credential type; repeatable",
+    )
+    parser.add_argument("--max-nodes", type=int, default=None, help="Skip workflows with more nodes than this")
+    parser.add_argument("--name-regex", default="", help="Only import workflows whose name matches this regex")
+    parser.add_argument(
+        "--preflight",
+        choices=("off", "reject", "quarantine"),
+        default="off",
+        help="Check node types, typeVersions and credential types against the target's installed ones "
+        "before sending; reject: report only, quarantine: also save the workflow under --quarantine-dir",
+    )
+    parser.add_argument(
+        "--node-types-ttl",
+        type=float,
+        default=NODE_TYPES_TTL_SECONDS,
+        help="Seconds the cached node type catalog of a target stays valid",
+    )
+    parser.add_argument(
+        "--quarantine-dir",
+        default="",
+        help="Where --preflight quarantine saves rejected workflows (default: next to --report)",
+    )
+    catalog_group = parser.add_mutually_exclusive_group()
+    catalog_group.add_argument(
+        "--write-catalog",
+        default="",
+        help="Also pack every scanned workflow into this catalog file for later --from-catalog runs",
+    )
+    catalog_group.add_argument(
+        "--from-catalog",
+        default="",
+        help="Import the workflows packed in this catalog instead of scanning any sources",
+    )
     args = parser.parse_args()
-
-    api_key = args.n8n_api_key.strip() or Path(
-        r"C:\Users\p8tty\Downloads\n8n templates\check_n8n_api.py"
-    ).read_text(encoding="utf-8", errors="ignore")
-    if not args.n8n_api_key.strip():
-        match = re.search(r'API_KEY\s*=\s*"([^"]+)"', api_key)
-        api_key = match.group(1).strip() if match else ""
-    if not api_key:
+    if args.similarity_threshold is not None and not 0 < args.similarity_threshold <= 1:
+        parser.error("--similarity-threshold must be in (0, 1]")
+    if args.mode == "sync" and args.no_index:
+        parser.error("--mode sync stores source-to-workflow mappings in the index; drop --no-index")
+    if args.archive_missing and args.mode != "sync":
+        parser.error("--archive-missing requires --mode sync")
+    try:
+        name_pattern = re.compile(args.name_regex) if args.name_regex else None
+    except re.error as exc:
+        parser.error(f"--name-regex: {exc}")
+    selection = CandidateFilter(
+        tuple(pattern.lower() for pattern in args.include_node_type),
+        tuple(pattern.lower() for pattern in args.exclude_node_type),
+        args.max_nodes,
+        name_pattern,
+    )
+    if selection and args.archive_missing:
+        parser.error("--archive-missing would archive every filtered-out workflow; drop the filters")
+    urls = list(dict.fromkeys(args.n8n_url)) or ["http://localhost:5678"]
+    api_keys = [key.strip() for key in args.n8n_api_key]
+    if len(api_keys) > 1 and len(api_keys) != len(urls):
+        parser.error("give one --n8n-api-key, or one per --n8n-url")
+    started = time.perf_counter()
+    if args.metrics_file or args.log_jsonl:
+        METRICS.configure(Path(args.log_jsonl) if args.log_jsonl else None)
+
+    if not api_keys:
+        fallback = Path(r"C:\Users\p8tty\Downloads\n8n templates\check_n8n_api.py").read_text(
+            encoding="utf-8", errors="ignore"
+        )
+        match = re.search(r'API_KEY\s*=\s*"([^"]+)"', fallback)
+        api_keys = [match.group(1).strip() if match else ""]
+    if not all(api_keys):
         print("Missing n8n API key. Provide --n8n-api-key.", file=sys.stderr)
         return 2
+    if len(api_keys) == 1:
+        api_keys = api_keys * len(urls)
 
     local_roots = [Path(path) for path in (DEFAULT_LOCAL_ROOTS + args.local_root)]
     local_zips = [Path(path) for path in (DEFAULT_LOCAL_ZIPS + args.local_zip)]
     online_repos = list(dict.fromkeys(DEFAULT_ONLINE_REPOS + args.repo))
 
-    temp_root = Path(tempfile.mkdtemp(prefix="n8n-master-import-"))
-    print(f"[setup] temp={temp_root}")
-
-    client = N8nApiClient(args.n8n_url, api_key)
-    client.healthcheck()
-    print("[setup] n8n reachable")
-
-    extracted_roots: List[Path] = []
-    for root in local_roots:
-        if root.exists():
-            extracted_roots.append(root)
-
-    for zip_path in Path(DEFAULT_LOCAL_ROOTS[0]).rglob("*.zip"):
-        extracted = extract_zip_to_folder(zip_path, temp_root / "local_zips")
-        if extracted:
-            extracted_roots.append(extracted)
-
-    for zip_path in local_zips:
-        extracted = extract_zip_to_folder(zip_path, temp_root / "explicit_zips")
-        if extracted:
-            extracted_roots.append(extracted)
-
-    if not args.skip_online:
-        online_root = temp_root / "online_repos"
-        for repo in online_repos:
-            extracted = download_and_extract_repo(repo, online_root)
-            if extracted:
-                print(f"[online] fetched {repo}")
-                extracted_roots.append(extracted)
-            else:
-                print(f"[online] skipped {repo} (download failed)")
-
-    candidates: List[WorkflowCandidate] = []
-
-    # Pull workflow-like JSON directly from very large archives, if present.
-    for zip_path in local_zips:
-        zip_candidates = discover_workflows_from_large_zip(zip_path)
-        if zip_candidates:
-            print(f"[scan] large-zip workflows from {zip_path.name}: {len(zip_candidates)}")
-            candidates.extend(zip_candidates)
-
-    file_count = 0
-    for json_file in discover_local_json_files(extracted_roots):
-        file_count += 1
-        payload = load_json_file(json_file)
-        if payload is None:
-            continue
-        workflows = extract_workflows_from_json(payload, str(json_file))
-        if workflows:
-            for workflow in workflows:
-                candidates.append(
-                    WorkflowCandidate(source=str(json_file), workflow=workflow)
-                )
-
-    print(f"[scan] files={file_count} candidates={len(candidates)}")
-    if not candidates:
-        print("[done] no workflow candidates found")
-        return 0
-
+    # With several targets every one gets its own report, journal and index
+    # file (named after the target) for its existing/sync state; the scan and
+    # its source cache are shared. A single target keeps the plain paths.
+    multi = len(urls) > 1
     report_path = Path(args.report)
-    summary = import_candidates(client, candidates, report_path)
-    print(
-        "[done] imported={imported} skipped={skippedDuplicates} failed={failed} report={report}".format(
-            **summary, report=report_path
+    scheme = f"v{FINGERPRINT_VERSION}:{args.dedupe_mode}"
+    index_path = Path(args.index) if args.index else report_path.with_name(f"{report_path.stem}.index.sqlite")
+    journal_path = (
+        Path(args.journal) if args.journal else report_path.with_name(f"{report_path.stem}.journal.jsonl")
+    )
+    catalog: Optional[CandidateCatalog] = None
+    if args.from_catalog:
+        try:
+            catalog = CandidateCatalog(Path(args.from_catalog))
+        except (OSError, ValueError) as exc:
+            print(f"Cannot read catalog: {exc}", file=sys.stderr)
+            return 2
+        if catalog.scheme != scheme:
+            print(
+                f"Catalog {args.from_catalog} was packed under {catalog.scheme}, this run uses {scheme}; "
+                "rescan or match --dedupe-mode.",
+                file=sys.stderr,
+            )
+            catalog.close()
+            return 2
+
+    targets: List[ImportTarget] = []
+    for url, api_key, slug in zip(urls, api_keys, target_slugs(urls)):
+        client = N8nApiClient(
+            url,
+            api_key,
+            pool_size=max(1, args.concurrency),
+            max_retries=max(0, args.max_retries),
         )
+        target = ImportTarget(
+            url,
+            client,
+            target_path(report_path, slug) if multi else report_path,
+            target_path(journal_path, slug) if multi else journal_path,
+            target_path(index_path, slug) if multi else index_path,
+        )
+        targets.append(target)
+        try:
+            client.healthcheck()
+            if args.preflight != "off":
+                node_types_path = report_path.with_name(f"{report_path.stem}.nodetypes.json")
+                target.node_catalog = NodeTypeCatalog.load(
+                    client, target_path(node_types_path, slug) if multi else node_types_path, args.node_types_ttl
+                )
+        except Exception as exc:
+            if not multi:
+                raise
+            # An unreachable instance gets no lane; the others still import.
+            print(f"[error] {url}: {exc}", file=sys.stderr)
+            target.summary = {"error": str(exc)}
+            continue
+        print(f"[setup] n8n reachable at {url}" if multi else "[setup] n8n reachable")
+        if args.preflight != "off":
+            if target.node_catalog is None:
+                print(f"[preflight] {url} does not serve node type descriptions; sending without validation")
+            if args.preflight == "quarantine":
+                quarantine_dir = (
+                    Path(args.quarantine_dir)
+                    if args.quarantine_dir
+                    else report_path.with_name(f"{report_path.stem}.quarantine")
+                )
+                target.quarantine_dir = quarantine_dir / slug if multi else quarantine_dir
+    live_targets = [target for target in targets if target.summary is None]
+
+    # Local roots, local ZIPs and repo downloads start together and feed
+    # the scan below as their refs arrive; nothing waits for all downloads.
+    source_tasks = build_source_tasks(
+        local_roots if catalog is None else [],
+        local_zips if catalog is None else [],
+        [] if args.skip_online or catalog is not None else online_repos,
+        Path(args.download_cache),
+        download_workers=args.download_workers,
     )
+    sources = [task.timing for task in source_tasks]
+
+    index: Optional[ImportIndex] = None
+    if not args.no_index:
+        index = ImportIndex(index_path, scheme=scheme)
+    for target in live_targets:
+        if index is not None:
+            target.index = ImportIndex(target.index_path, scheme=scheme) if multi else index
+        target.journal = ImportJournal(target.journal_path, scheme=scheme, resume=args.resume)
+        if args.resume:
+            prefix = f"[resume {target.url}]" if multi else "[resume]"
+            if target.journal.entries is None:
+                print(f"{prefix} no usable journal, starting a fresh run")
+            else:
+                print(f"{prefix} replaying {len(target.journal.entries)} journal entries")
+
+    scan_stats = {"files": 0, "candidates": 0, "filtered": 0}
+
+    def scan() -> Iterator[WorkflowCandidate]:
+        if catalog is not None:
+            for candidate in catalog.select(selection if selection else None):
+                scan_stats["candidates"] += candidate.duplicate_of is None
+                yield candidate
+            scan_stats["filtered"] = sum(1 for entry in catalog.entries if entry[0] >= 0) - scan_stats["candidates"]
+            print(
+                f"[catalog] candidates={scan_stats['candidates']} filtered={scan_stats['filtered']} "
+                f"from {catalog.path}"
+            )
+            return
+        # Local folders (including ZIPs nested in them), explicit ZIPs and repo
+        # archives are all read in place through one streaming source reader.
+        discovered = timed_iter(schedule_sources(source_tasks), "walk")
+        refs = run_stage(discovered, maxsize=STAGE_QUEUE_SIZE * 4)
+        scanned = iter_source_candidates(refs, scan_stats, index, workers=args.workers, dedupe_mode=args.dedupe_mode)
+        # The catalog keeps everything scanned; filters only narrow the import.
+        writer = CatalogWriter(Path(args.write_catalog), scheme) if args.write_catalog else None
+        if writer is not None:
+            scanned = write_catalog(scanned, writer, args.dedupe_mode)
+        if selection:
+            scanned = select_candidates(scanned, selection, scan_stats)
+        yield from scanned
+        if writer is not None:
+            print(f"[catalog] packed {len(writer)} entries into {writer.path}")
+        print(
+            f"[scan] files={scan_stats['files']} candidates={scan_stats['candidates']} "
+            f"filtered={scan_stats['filtered']}"
+        )
 
-    shutil.rmtree(temp_root, ignore_errors=True)
-    return 0
+    def run_lane(target: ImportTarget, candidates: Iterable[WorkflowCandidate]) -> Dict:
+        try:
+            return import_candidates(
+                target.client,
+                candidates,
+                target.report_path,
+                concurrency=args.concurrency,
+                fingerprint_index=target.index,
+                dedupe_mode=args.dedupe_mode,
+                similarity_threshold=args.similarity_threshold,
+                mode=args.mode,
+                archive_missing=args.archive_missing,
+                journal=target.journal,
+                sources=None if multi else sources,
+                node_catalog=target.node_catalog,
+                quarantine_dir=target.quarantine_dir,
+                source_tasks=source_tasks if catalog is None else None,
+            )
+        finally:
+            # A lane that failed (even before reading, e.g. listing got a
+            # 401) must not leave the shared scan blocked on its queue.
+            if isinstance(candidates, FanOutLane):
+                candidates.close()
+
+    failed_targets = len(targets) - len(live_targets)
+    try:
+        if not multi:
+            # Discovery, parsing and importing overlap: the import loop pulls
+            # from a bounded queue while the scan keeps producing behind it.
+            targets[0].summary = run_lane(targets[0], run_stage(scan(), maxsize=STAGE_QUEUE_SIZE))
+        else:
+            # One scan, one import lane per target. A failing target is
+            # reported and the others carry on; Ctrl-C stops every lane.
+            stop = threading.Event()
+            futures: List[Future] = []
+            if live_targets:
+                lanes = fan_out(scan(), len(live_targets), STAGE_QUEUE_SIZE, stop)
+                with ThreadPoolExecutor(max_workers=len(live_targets)) as executor:
+                    futures = [executor.submit(run_lane, target, lane) for target, lane in zip(live_targets, lanes)]
+                    try:
+                        for future in futures:
+                            future.exception()
+                    except BaseException:
+                        stop.set()
+                        raise
+            for target, future in zip(live_targets, futures):
+                error = future.exception()
+                if error is not None:
+                    failed_targets += 1
+                    print(f"[error] {target.url}: {error}", file=sys.stderr)
+                    target.summary = {"error": str(error)}
+                else:
+                    target.summary = future.result()
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            combined = {
+                "timestamp": int(time.time()),
+                "targets": [
+                    {"url": target.url, "report": str(target.report_path), **(target.summary or {})}
+                    for target in targets
+                ],
+                "sources": sources,
+            }
+            report_path.write_text(json.dumps(combined, indent=2), encoding="utf-8")
+    finally:
+        for target in targets:
+            if target.journal is not None:
+                target.journal.close()
+            if target.index is not None and target.index is not index:
+                target.index.close()
+        if index is not None:
+            index.close()
+        if catalog is not None:
+            catalog.close()
+        elapsed = time.perf_counter() - started
+        METRICS.set_gauge("run_seconds", elapsed)
+        METRICS.set_gauge("scanned_files", scan_stats["files"])
+        METRICS.set_gauge("scanned_candidates", scan_stats["candidates"])
+        METRICS.set_gauge("filtered_candidates", scan_stats["filtered"])
+        METRICS.set_gauge("files_per_second", scan_stats["files"] / elapsed if elapsed else 0.0)
+        METRICS.event("run_end", seconds=round(elapsed, 3), **scan_stats)
+        if args.metrics_file:
+            METRICS.write_textfile(Path(args.metrics_file))
+        METRICS.close()
+    for target in targets:
+        summary = target.summary or {}
+        prefix = f"[done {target.url}]" if multi else "[done]"
+        if "error" in summary:
+            continue
+        if not summary["totalCandidates"]:
+            print(f"{prefix} no workflow candidates found")
+        elif args.mode == "sync":
+            print(
+                "{prefix} imported={imported} updated={updated} unchanged={unchanged} archived={archived} "
+                "failed={failed} report={report}".format(**summary, prefix=prefix, report=target.report_path)
+            )
+        else:
+            print(
+                "{prefix} imported={imported} skipped={skippedDuplicates} failed={failed} report={report}".format(
+                    **summary, prefix=prefix, report=target.report_path
+                )
+            )
+        if summary.get("rejected"):
+            top = ", ".join(f"{problem} ({count})" for problem, count in list(summary["rejectedByType"].items())[:5])
+            print(f"{prefix} rejected={summary['rejected']} before sending: {top}")
+    return 1 if failed_targets else 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the n8n public API used by n8n_master_import.py.
+
+Implements the endpoints the importer talks to (list, create, update,
+archive, node/credential type descriptions) with an in-memory workflow
+store, cursor pagination, configurable latency and 429/5xx injection, so
+import throughput, retries, dedupe, sync and pre-flight checks can be
+exercised offline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class MockN8nState:
+    def __init__(
+        self,
+        api_key: str = "",
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: str = "",
+        seed: Optional[int] = None,
+        node_types: Optional[List[Dict]] = None,
+        credential_types: Optional[List[Dict]] = None,
+    ) -> None:
+        self.api_key = api_key
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.workflows: Dict[str, Dict] = {}
+        self.next_id = 1
+        # Served as /types/*.json when set; creates and updates using other
+        # node types are then refused with a 400, like a real instance.
+        self.node_types = node_types
+        self.credential_types = credential_types
+        self.stats = {"requests": 0, "created": 0, "updated": 0, "archived": 0, "throttled": 0, "errors": 0}
+
+    def unknown_node_type(self, payload: Dict) -> Optional[str]:
+        if self.node_types is None:
+            return None
+        known = {row.get("name") for row in self.node_types}
+        for node in payload.get("nodes", []):
+            if isinstance(node, dict) and node.get("type") not in known:
+                return str(node.get("type"))
+        return None
+
+    def delay(self) -> None:
+        with self.lock:
+            extra = self.rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        total = self.latency_ms + extra
+        if total > 0:
+            time.sleep(total / 1000.0)
+
+    def injected_failure(self) -> Optional[int]:
+        with self.lock:
+            roll = self.rng.random()
+            if roll < self.throttle_rate:
+                self.stats["throttled"] += 1
+                return 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return 503
+        return None
+
+    def create(self, payload: Dict) -> Dict:
+        with self.lock:
+            workflow_id = str(self.next_id)
+            self.next_id += 1
+            now = datetime.now(timezone.utc).isoformat()
+            row = dict(payload)
+            row.update({"id": workflow_id, "active": False, "createdAt": now, "updatedAt": now})
+            self.workflows[workflow_id] = row
+            self.stats["created"] += 1
+            return row
+
+    def update(self, workflow_id: str, payload: Dict) -> Optional[Dict]:
+        with self.lock:
+            row = self.workflows.get(workflow_id)
+            if row is None or row.get("isArchived"):
+                return None
+            row.update(payload)
+            row["updatedAt"] = datetime.now(timezone.utc).isoformat()
+            self.stats["updated"] += 1
+            return dict(row)
+
+    def archive(self, workflow_id: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.workflows.get(workflow_id)
+            if row is None:
+                return None
+            row.update({"isArchived": True, "active": False, "updatedAt": datetime.now(timezone.utc).isoformat()})
+            self.stats["archived"] += 1
+            return dict(row)
+
+    def page(self, limit: int, cursor: Optional[str]) -> Tuple[List[Dict], Optional[str]]:
+        with self.lock:
+            ids = sorted((key for key, row in self.workflows.items() if not row.get("isArchived")), key=int)
+            start = int(cursor) if cursor and cursor.isdigit() else 0
+            rows = [self.workflows[workflow_id] for workflow_id in ids[start : start + limit]]
+            next_cursor = str(start + limit) if start + limit < len(ids) else None
+        return rows, next_cursor
+
+
+class MockN8nHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "n8n-mock/1.0"
+
+    def setup(self) -> None:
+        super().setup()
+        # Headers and body go out in separate writes; without NODELAY every
+        # keep-alive response stalls on Nagle + delayed ACK.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    @property
+    def state(self) -> MockN8nState:
+        return self.server.state  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args: object) -> None:
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, payload: object, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self) -> Optional[object]:
+        length = int(self.headers.get("content-length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(raw.decode("utf-8") or "null")
+        except Exception:
+            return None
+
+    @staticmethod
+    def workflow_id(path: str) -> Optional[str]:
+        prefix = "/api/v1/workflows/"
+        if path.startswith(prefix) and path[len(prefix) :].isdigit():
+            return path[len(prefix) :]
+        return None
+
+    def begin(self) -> bool:
+        # Shared preamble: latency, fault injection and API key check.
+        with self.state.lock:
+            self.state.stats["requests"] += 1
+        self.state.delay()
+        failure = self.state.injected_failure()
+        if failure == 429:
+            headers = {"Retry-After": self.state.retry_after} if self.state.retry_after else None
+            self.send_json(429, {"message": "Too many requests"}, headers)
+            return False
+        if failure:
+            self.send_json(failure, {"message": "Injected failure"})
+            return False
+        if self.state.api_key and self.headers.get("X-N8N-API-KEY") != self.state.api_key:
+            self.send_json(401, {"message": "unauthorized"})
+            return False
+        return True
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/healthz":
+            self.send_json(200, {"status": "ok"})
+            return
+        if url.path in ("/types/nodes.json", "/types/credentials.json"):
+            rows = self.state.node_types if url.path == "/types/nodes.json" else self.state.credential_types
+            if rows is None:
+                self.send_json(404, {"message": "not found"})
+            else:
+                self.send_json(200, rows)
+            return
+        if url.path == "/mock/stats":
+            with self.state.lock:
+                stats = dict(self.state.stats, workflows=len(self.state.workflows))
+            stats["archivedWorkflows"] = sum(1 for row in self.state.workflows.values() if row.get("isArchived"))
+            self.send_json(200, stats)
+            return
+        if not self.begin():
+            return
+        if url.path == "/api/v1/workflows":
+            query = parse_qs(url.query)
+            try:
+                limit = max(1, min(250, int(query.get("limit", ["100"])[0])))
+            except ValueError:
+                limit = 100
+            rows, next_cursor = self.state.page(limit, query.get("cursor", [None])[0])
+            self.send_json(200, {"data": rows, "nextCursor": next_cursor})
+            return
+        workflow_id = self.workflow_id(url.path)
+        if workflow_id:
+            with self.state.lock:
+                row = self.state.workflows.get(workflow_id)
+                row = dict(row) if row else None
+            if row:
+                self.send_json(200, row)
+            else:
+                self.send_json(404, {"message": "not found"})
+            return
+        self.send_json(404, {"message": "not found"})
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        payload = self.read_json()
+        if not self.begin():
+            return
+        if url.path == "/api/v1/workflows":
+            if not isinstance(payload, dict) or not isinstance(payload.get("nodes"), list):
+                self.send_json(400, {"message": "request/body must have required property 'nodes'"})
+                return
+            unknown = self.state.unknown_node_type(payload)
+            if unknown:
+                self.send_json(400, {"message": f"Unrecognized node type: {unknown}"})
+                return
+            self.send_json(200, self.state.create(payload))
+            return
+        parts = url.path.rsplit("/", 1)
+        workflow_id = self.workflow_id(parts[0])
+        if workflow_id and parts[1] in ("archive", "deactivate"):
+            row = self.state.archive(workflow_id)
+            if row:
+                self.send_json(200, row)
+            else:
+                self.send_json(404, {"message": "not found"})
+            return
+        self.send_json(404, {"message": "not found"})
+
+    def do_PUT(self) -> None:
+        url = urlparse(self.path)
+        payload = self.read_json()
+        if not self.begin():
+            return
+        workflow_id = self.workflow_id(url.path)
+        if not workflow_id:
+            self.send_json(404, {"message": "not found"})
+            return
+        if not isinstance(payload, dict) or not isinstance(payload.get("nodes"), list):
+            self.send_json(400, {"message": "request/body must have required property 'nodes'"})
+            return
+        unknown = self.state.unknown_node_type(payload)
+        if unknown:
+            self.send_json(400, {"message": f"Unrecognized node type: {unknown}"})
+            return
+        row = self.state.update(workflow_id, payload)
+        if row:
+            self.send_json(200, row)
+        else:
+            self.send_json(404, {"message": "not found"})
+
+
+def make_server(host: str, port: int, state: MockN8nState, verbose: bool = False) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), MockN8nHandler)
+    server.daemon_threads = True
+    server.state = state  # type: ignore[attr-defined]
+    server.verbose = verbose  # type: ignore[attr-defined]
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a local mock of the n8n workflow API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5679)
+    parser.add_argument("--api-key", default="", help="Require this X-N8N-API-KEY (default: accept any)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed delay added to every API call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra uniform random delay per call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of API calls answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of API calls answered with 429")
+    parser.add_argument("--retry-after", default="", help="Retry-After header value sent with 429s")
+    parser.add_argument("--seed-workflows", default="", help="JSON file (list of workflows) to preload")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for latency/fault injection")
+    parser.add_argument(
+        "--node-types",
+        default="",
+        help="JSON file in the /types/nodes.json format; enables node type checks on create/update",
+    )
+    parser.add_argument(
+        "--credential-types",
+        default="",
+        help="JSON file in the /types/credentials.json format (default with --node-types: none installed)",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    state = MockN8nState(
+        api_key=args.api_key,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    if args.node_types:
+        with open(args.node_types, encoding="utf-8") as handle:
+            state.node_types = json.load(handle)
+        state.credential_types = []
+    if args.credential_types:
+        with open(args.credential_types, encoding="utf-8") as handle:
+            state.credential_types = json.load(handle)
+    if args.seed_workflows:
+        with open(args.seed_workflows, encoding="utf-8") as handle:
+            rows = json.load(handle)
+        for row in rows if isinstance(rows, list) else []:
+            if isinstance(row, dict):
+                state.create(row)
+
+    server = make_server(args.host, args.port, state, verbose=args.verbose)
+    print(f"[mock] n8n API on http://{args.host}:{server.server_address[1]} workflows={len(state.workflows)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,950 @@
+import copy
+import io
+import json
+import random
+import re
+import struct
+import threading
+import time
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import pytest
+
+from n8n_master_import import (
+    CandidateCatalog,
+    CandidateFilter,
+    CatalogWriter,
+    ImportIndex,
+    ImportJournal,
+    Metrics,
+    N8nApiClient,
+    NameAllocator,
+    NearDuplicateIndex,
+    NodeTypeCatalog,
+    SourceTask,
+    WorkflowCandidate,
+    discover_local_json_files,
+    discover_sources,
+    extract_workflows_from_json,
+    import_candidates,
+    iter_json_stream_workflows,
+    iter_source_candidates,
+    json_fingerprint,
+    main,
+    normalize_workflow,
+    sanitize_name,
+    schedule_sources,
+    select_candidates,
+    scan_json_file,
+    workflow_features,
+)
+from n8n_mock_server import MockN8nState, make_server
+
+RAW_WORKFLOWS = [
+    {
+        "name": "  Lead   intake: CRM -> Slack!!  ",
+        "active": True,
+        "id": "abc",
+        "tags": [{"name": "crm"}],
+        "nodes": [
+            {
+                "id": "1",
+                "name": "Webhook",
+                "type": "n8n-nodes-base.webhook",
+                "typeVersion": "2",
+                "position": ["100", 200.5],
+                "parameters": {"path": "lead", "httpMethod": "POST"},
+                "webhookId": 12345,
+                "disabled": "false",
+                "extra": "dropped",
+            },
+            {
+                "name": "Notify",
+                "type": "n8n-nodes-base.slack",
+                "credentials": {"slackApi": {"id": "7", "name": "Slack"}},
+                "notes": 42,
+                "onError": "continueErrorOutput",
+                "retryOnFail": "yes",
+                "maxTries": "3",
+                "waitBetweenTries": True,
+                "alwaysOutputData": 1,
+                "executeOnce": "maybe",
+                "notesInFlow": True,
+            },
+            {"name": "", "type": "n8n-nodes-base.noOp"},
+            {"name": "No type"},
+            "not-a-node",
+            {
+                "parameters": ["not", "a", "dict"],
+                "type": "n8n-nodes-base.set",
+                "position": [1],
+                "name": "Set",
+                "credentials": "broken",
+                "onError": "explode",
+                "notes": None,
+                "typeVersion": None,
+                "continueOnFail": "0",
+            },
+        ],
+        "connections": {"Webhook": {"main": [[{"node": "Notify", "type": "main", "index": 0}]]}},
+        "settings": {
+            "executionOrder": "v1",
+            "timezone": " Europe/Berlin ",
+            "errorWorkflow": "",
+            "callerPolicy": "workflowsFromSameOwner",
+            "saveExecutionProgress": "true",
+            "saveManualExecutions": True,
+        },
+        "pinData": {"Webhook": [{"json": {}}]},
+    },
+    {
+        "nodes": [{"name": "Only", "type": "n8n-nodes-base.manualTrigger", "typeVersion": 1.1}],
+        "connections": [],
+        "settings": "bad",
+    },
+    {"name": "Empty", "nodes": [], "connections": {}},
+    {"name": "All invalid nodes", "nodes": [{"name": "x"}], "connections": {}},
+    {"name": "Missing connections", "nodes": [{"name": "a", "type": "b"}]},
+    {"name": 99, "nodes": [{"name": "a", "type": "b", "position": [None, "1e2"]}], "connections": {}},
+]
+
+# Serialized output of normalize_workflow; key order matters because it is
+# what gets POSTed to n8n. Defaulted typeVersion/position values are floats.
+GOLDEN_OUTPUT = [
+    (
+        '{"name": "Lead intake: CRM - Slack", "nodes": [{"name": "Webhook", "type": "n8n-nodes-base.webho'
+        'ok", "typeVersion": 2.0, "position": [100.0, 200.5], "parameters": {"path": "lead", "httpMethod"'
+        ': "POST"}, "webhookId": "12345", "disabled": false}, {"name": "Notify", "type": "n8n-nodes-base.'
+        'slack", "credentials": {"slackApi": {"id": "7", "name": "Slack"}}, "notes": "42", "onError": "co'
+        'ntinueErrorOutput", "retryOnFail": true, "maxTries": 3.0, "notesInFlow": true, "parameters": {},'
+        ' "typeVersion": 1.0, "position": [0.0, 0.0]}, {"parameters": {}, "type": "n8n-nodes-base.set", "'
+        'position": [0.0, 0.0], "name": "Set", "typeVersion": 1.0, "continueOnFail": false}], "connection'
+        's": {"Webhook": {"main": [[{"node": "Notify", "type": "main", "index": 0}]]}}, "settings": {"exe'
+        'cutionOrder": "v1", "timezone": "Europe/Berlin", "callerPolicy": "workflowsFromSameOwner", "save'
+        'ExecutionProgress": true}}'
+    ),
+    (
+        '{"name": "lead-intake", "nodes": [{"name": "Only", "type": "n8n-nodes-base.manualTrigger", "type'
+        'Version": 1.1, "parameters": {}, "position": [0.0, 0.0]}], "connections": {}, "settings": {}}'
+    ),
+    'null',
+    'null',
+    'null',
+    (
+        '{"name": "lead-intake", "nodes": [{"name": "a", "type": "b", "position": [0.0, 100.0], "paramete'
+        'rs": {}, "typeVersion": 1.0}], "connections": {}, "settings": {}}'
+    ),
+]
+
+
+MockFactory = Callable[..., Tuple[MockN8nState, str]]
+
+
+@pytest.fixture
+def mock_n8n() -> Iterator[MockFactory]:
+    # Starts mock n8n servers on free ports; each call returns (state, base url).
+    servers = []
+
+    def start(state: Optional[MockN8nState] = None, **options: object) -> Tuple[MockN8nState, str]:
+        state = state or MockN8nState(**options)
+        server = make_server("127.0.0.1", 0, state)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return state, f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_normalize_workflow_matches_golden_output() -> None:
+    for raw, expected in zip(RAW_WORKFLOWS, GOLDEN_OUTPUT):
+        normalized = normalize_workflow(raw, "templates/lead-intake.json")
+        assert json.dumps(normalized, ensure_ascii=True) == expected
+
+
+def test_normalize_workflow_is_idempotent() -> None:
+    # Existing n8n workflows are re-normalized for dedupe, so a second pass
+    # must not change anything.
+    for raw in RAW_WORKFLOWS:
+        normalized = normalize_workflow(raw, "templates/lead-intake.json")
+        if normalized:
+            assert normalize_workflow(json.loads(json.dumps(normalized)), "existing") == normalized
+
+
+def test_normalize_workflow_leaves_input_untouched() -> None:
+    raw = copy.deepcopy(RAW_WORKFLOWS)
+    for workflow in raw:
+        normalize_workflow(workflow, "templates/lead-intake.json")
+    assert raw == RAW_WORKFLOWS
+
+
+def _probe_unique_name(base_name: str, used_names: set) -> str:
+    # Reference: the original linear-probing make_unique_name.
+    name = sanitize_name(base_name)
+    if name not in used_names:
+        used_names.add(name)
+        return name
+    suffix = 2
+    while True:
+        candidate = sanitize_name(f"{name} [{suffix}]")
+        if candidate not in used_names:
+            used_names.add(candidate)
+            return candidate
+        suffix += 1
+
+
+def test_name_allocator_matches_linear_probing() -> None:
+    pool = ["My workflow", "  My   workflow ", "My workflow [2]", "Untitled", "! x", "a ! b", "Flow\t1", ""]
+    rng = random.Random(7)
+    bases = [rng.choice(pool) for _ in range(500)]
+    reference_used = {"My workflow", "My workflow [3]"}
+    allocator = NameAllocator(set(reference_used))
+    expected = [_probe_unique_name(base, reference_used) for base in bases]
+    assert [allocator.allocate(base) for base in bases] == expected
+
+
+def test_name_allocator_keeps_suffix_on_long_names() -> None:
+    allocator = NameAllocator()
+    names = [allocator.allocate("y" * 200) for _ in range(20)]
+    assert len(set(names)) == 20
+    assert all(len(name) <= 180 for name in names)
+    assert names[-1].endswith(" [20]")
+
+
+def test_import_retries_and_dedupes_against_mock_server(tmp_path: Path, mock_n8n: MockFactory) -> None:
+    state, url = mock_n8n(throttle_rate=0.2, error_rate=0.1, seed=3)
+    client = N8nApiClient(url, "key", pool_size=4, max_retries=8, backoff_base=0.001)
+    workflows = [normalize_workflow(raw, "golden.json") for raw in RAW_WORKFLOWS]
+    candidates = [WorkflowCandidate(source="golden.json", workflow=wf) for wf in workflows if wf]
+    first = import_candidates(client, candidates, tmp_path / "first.json", concurrency=4)
+    second = import_candidates(client, candidates, tmp_path / "second.json", concurrency=4)
+
+    assert (first["imported"], first["failed"]) == (len(candidates), 0)
+    rows = [json.loads(line) for line in (tmp_path / "first.rows.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [row["index"] for row in rows] == list(range(1, len(candidates) + 1))
+    assert all(row["outcome"] == "imported" and row["latencyMs"] >= 0 for row in rows)
+    assert (second["imported"], second["skippedDuplicates"]) == (0, len(candidates))
+    assert state.stats["throttled"] + state.stats["errors"] > 0
+
+
+def test_timed_out_create_is_not_resent_and_becomes_a_failed_row(tmp_path: Path, mock_n8n: MockFactory) -> None:
+    state, url = mock_n8n(latency_ms=300)
+    client = N8nApiClient(url, "key", timeout=0.1, max_retries=3, backoff_base=0.001)
+    workflows = [normalize_workflow(raw, "golden.json") for raw in RAW_WORKFLOWS]
+    candidates = [WorkflowCandidate(source="golden.json", workflow=wf) for wf in workflows if wf][:1]
+    client.iter_workflows = lambda: iter(())  # type: ignore[method-assign]
+    summary = import_candidates(client, candidates, tmp_path / "report.json")
+    time.sleep(0.5)
+
+    assert (summary["imported"], summary["failed"]) == (0, 1)
+    assert state.stats["created"] == 1
+    row = json.loads((tmp_path / "report.rows.jsonl").read_text(encoding="utf-8"))
+    assert row["outcome"] == "failed" and "request failed" in row["error"]
+
+
+def test_sync_mode_updates_changed_and_archives_missing(tmp_path: Path, mock_n8n: MockFactory) -> None:
+    state, url = mock_n8n()
+    index = ImportIndex(tmp_path / "index.sqlite")
+
+    def candidates(sources: Dict[str, str]) -> List[WorkflowCandidate]:
+        rows = []
+        for source, url in sources.items():
+            raw = {
+                "name": "Fetch",
+                "nodes": [{"name": "Get", "type": "n8n-nodes-base.httpRequest", "parameters": {"url": url}}],
+                "connections": {},
+            }
+            rows.append(WorkflowCandidate(source=source, workflow=normalize_workflow(raw, source)))
+        return rows
+
+    try:
+        client = N8nApiClient(url, "key")
+        first = import_candidates(
+            client,
+            candidates({"a.json": "https://a", "b.json": "https://b", "c.json": "https://c"}),
+            tmp_path / "first.json",
+            fingerprint_index=index,
+            mode="sync",
+        )
+        second = import_candidates(
+            client,
+            candidates({"a.json": "https://a", "b.json": "https://b2"}),
+            tmp_path / "second.json",
+            fingerprint_index=index,
+            mode="sync",
+            archive_missing=True,
+        )
+    finally:
+        index.close()
+
+    assert first["imported"] == 3
+    assert (second["imported"], second["updated"], second["unchanged"], second["archived"]) == (0, 1, 1, 1)
+    rows = [json.loads(line) for line in Path(second["rows"]).read_text(encoding="utf-8").splitlines()]
+    assert [(row["outcome"], row["source"], row["name"]) for row in rows] == [
+        ("unchanged", "a.json", "Fetch"),
+        ("updated", "b.json", "Fetch [2]"),
+        ("archived", "c.json", "Fetch [3]"),
+    ]
+    assert state.workflows["2"]["nodes"][0]["parameters"] == {"url": "https://b2"}
+    assert state.workflows["3"]["isArchived"] is True
+
+
+def test_archive_missing_leaves_sources_that_were_not_scanned(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, mock_n8n: MockFactory
+) -> None:
+    import n8n_master_import
+
+    for root, names in (("a", ["kept", "deleted"]), ("b", ["unmounted"])):
+        (tmp_path / root).mkdir()
+        for name in names:
+            workflow = _pipeline(name, ["set", name])
+            (tmp_path / root / f"{name}.json").write_text(json.dumps(workflow), encoding="utf-8")
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    with zipfile.ZipFile(cache / "owner__repo__main.zip", "w") as archive:
+        archive.writestr("repo/online.json", json.dumps(_pipeline("online", ["set", "online"])))
+    online = {"owner/repo": (cache / "owner__repo__main.zip", "downloaded")}
+    monkeypatch.setattr(
+        n8n_master_import, "download_repo_archive", lambda repo, _: online.get(repo, (None, "download failed"))
+    )
+    state, url = mock_n8n()
+
+    def run() -> Dict:
+        argv = ["n8n_master_import.py", "--mode", "sync", "--archive-missing", "--n8n-api-key", "key"]
+        argv += ["--n8n-url", url, "--report", str(tmp_path / "r.json"), "--download-cache", str(cache)]
+        argv += ["--local-root", str(tmp_path / "a"), "--local-root", str(tmp_path / "b"), "--repo", "owner/repo"]
+        monkeypatch.setattr("sys.argv", argv)
+        assert main() == 0
+        return json.loads((tmp_path / "r.json").read_text(encoding="utf-8"))
+
+    assert run()["imported"] == 4
+    # b is unmounted, the repo download fails and one file really is deleted.
+    (tmp_path / "b").rename(tmp_path / "b-moved")
+    online.clear()
+    (tmp_path / "a" / "deleted.json").unlink()
+    summary = run()
+    statuses = {source["source"]: source["status"] for source in summary["sources"]}
+    assert statuses[str(tmp_path / "b")] == "missing" and statuses["owner/repo"] == "download failed"
+    assert (summary["archived"], summary["unchanged"]) == (1, 1)
+    archived = {row["name"] for row in state.workflows.values() if row.get("isArchived")}
+    assert archived == {"deleted"}
+
+
+def test_existing_snapshot_only_refingerprints_changed_workflows(tmp_path: Path, mock_n8n: MockFactory) -> None:
+    state, url = mock_n8n()
+    index = ImportIndex(tmp_path / "index.sqlite")
+    workflows = [normalize_workflow(raw, "golden.json") for raw in RAW_WORKFLOWS]
+    candidates = [WorkflowCandidate(source="golden.json", workflow=wf) for wf in workflows if wf]
+    try:
+        client = N8nApiClient(url, "key")
+        first = import_candidates(client, candidates, tmp_path / "first.json", fingerprint_index=index)
+        second = import_candidates(client, candidates, tmp_path / "second.json", fingerprint_index=index)
+        state.update("1", {"name": "Edited in the UI"})
+        del state.workflows["2"]
+        third = import_candidates(client, candidates, tmp_path / "third.json", fingerprint_index=index)
+    finally:
+        index.close()
+
+    assert first["imported"] == len(candidates)
+    assert (second["existingWorkflows"], second["existingFingerprinted"]) == (len(candidates), 0)
+    assert second["skippedDuplicates"] == len(candidates)
+    assert (third["existingWorkflows"], third["existingFingerprinted"]) == (len(candidates) - 1, 1)
+    assert third["imported"] == 1
+
+
+def _pipeline(name: str, node_types: List[str], label: str = "", value: str = "v") -> Dict:
+    nodes = [
+        {
+            "name": f"{label}{node_type} {i}",
+            "type": f"n8n-nodes-base.{node_type}",
+            "position": [i * 200 + len(label), len(value)],
+            "parameters": {"field": f"{value}{i}", "mode": value},
+        }
+        for i, node_type in enumerate(node_types)
+    ]
+    connections = {
+        nodes[i]["name"]: {"main": [[{"node": nodes[i + 1]["name"], "type": "main", "index": 0}]]}
+        for i in range(len(nodes) - 1)
+    }
+    return {"name": name, "nodes": nodes, "connections": connections}
+
+
+def test_near_duplicate_forks_are_skipped_against_cached_signatures(tmp_path: Path, mock_n8n: MockFactory) -> None:
+    types = ["webhook", "set", "if", "httpRequest", "code", "merge", "slack", "gmail", "wait", "noOp", "filter", "sort"]
+    template = _pipeline("Template", types)
+    # Names, positions and parameter values differ, plus one extra node.
+    fork = _pipeline("My fork", types + ["telegram"], label="renamed ", value="edited")
+    second_fork = _pipeline("Another fork", types[:-1], label="copy of ", value="changed")
+    unrelated = _pipeline("Unrelated", ["cron", "postgres", "airtable", "discord"])
+
+    for threshold in (0.5, 0.8, 0.9, 0.95):
+        rows = NearDuplicateIndex._pick_rows(threshold, 64)
+        assert (1 / (64 // rows)) ** (1 / rows) <= threshold
+    template_features = workflow_features(template)
+    assert template_features < workflow_features(fork)
+    assert workflow_features(_pipeline("Moved", types, label="x", value="y")) == template_features
+    assert not template_features & workflow_features(unrelated)
+
+    state, url = mock_n8n()
+    template_id = state.create(template)["id"]
+    index = ImportIndex(tmp_path / "index.sqlite")
+
+    def candidates(*workflows: Dict) -> List[WorkflowCandidate]:
+        return [
+            WorkflowCandidate(source=f"{wf['name']}.json", workflow=normalize_workflow(wf, f"{wf['name']}.json"))
+            for wf in workflows
+        ]
+
+    try:
+        client = N8nApiClient(url, "key")
+        options = {"fingerprint_index": index, "similarity_threshold": 0.8}
+        first = import_candidates(client, candidates(fork, unrelated), tmp_path / "first.json", **options)
+        second = import_candidates(client, candidates(second_fork), tmp_path / "second.json", **options)
+    finally:
+        index.close()
+
+    assert (first["imported"], first["skippedNearDuplicates"], first["existingFingerprinted"]) == (1, 1, 1)
+    rows = [json.loads(line) for line in (tmp_path / "first.rows.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [(row["outcome"], row["name"]) for row in rows] == [
+        ("skippedNearDuplicates", "My fork"),
+        ("imported", "Unrelated"),
+    ]
+    assert rows[0]["nearDuplicateOf"]["workflowId"] == template_id and rows[0]["similarity"] >= 0.8
+    # Both existing workflows are seeded from the signatures cached in the index.
+    assert (second["existingWorkflows"], second["existingFingerprinted"]) == (2, 0)
+    assert (second["imported"], second["skippedNearDuplicates"]) == (0, 1)
+    assert state.stats["created"] == 2
+
+
+def test_structural_fingerprint_ignores_layout_but_exact_does_not(tmp_path: Path, mock_n8n: MockFactory) -> None:
+    workflow = _pipeline("Layout", ["webhook", "set", "if", "slack", "gmail"] * 30)
+    first = workflow["nodes"][0]["name"]
+    workflow["connections"][first]["main"][0].append({"node": workflow["nodes"][2]["name"], "type": "main", "index": 0})
+    shuffled = copy.deepcopy(workflow)
+    shuffled["name"] = "Layout moved"
+    random.Random(7).shuffle(shuffled["nodes"])
+    for node in shuffled["nodes"]:
+        node["position"] = [node["position"][1], node["position"][0] + 40]
+    shuffled["connections"][first]["main"][0].reverse()
+
+    original, variant = (normalize_workflow(raw, "layout.json") for raw in (workflow, shuffled))
+    assert json_fingerprint(original, "structural") == json_fingerprint(variant, "structural")
+    assert json_fingerprint(original, "exact") != json_fingerprint(variant, "exact")
+    # Order between output slots is meaningful and still tells workflows apart.
+    rewired = copy.deepcopy(original)
+    rewired["connections"][first]["main"].insert(0, [])
+    assert json_fingerprint(original, "structural") != json_fingerprint(rewired, "structural")
+
+    state, url = mock_n8n()
+    client = N8nApiClient(url, "key")
+    for mode in ("structural", "exact"):
+        import_candidates(client, [WorkflowCandidate(source="a.json", workflow=original)], tmp_path / f"{mode}.json")
+        moved = [WorkflowCandidate(source="b.json", workflow=variant)]
+        summary = import_candidates(client, moved, tmp_path / f"{mode}-again.json", dedupe_mode=mode)
+        assert summary["skippedDuplicates"] == (1 if mode == "structural" else 0)
+        state.workflows.clear()
+
+
+def test_metrics_textfile_and_jsonl(tmp_path: Path) -> None:
+    metrics = Metrics()
+    metrics.inc("files_read")
+    with metrics.stage("parse"):
+        pass
+    assert not metrics.counters and not metrics.stages
+
+    metrics.configure(tmp_path / "run.jsonl")
+    with metrics.stage("parse"):
+        pass
+    metrics.inc("bytes_read", 10)
+    metrics.inc("n8n_responses", method="POST", status="429")
+    metrics.observe("n8n_request_seconds", 0.02, method="POST")
+    metrics.observe("n8n_request_seconds", 40.0, method="POST")
+    metrics.event("progress", processed=100)
+    metrics.write_textfile(tmp_path / "import.prom")
+    metrics.close()
+
+    lines = (tmp_path / "import.prom").read_text(encoding="utf-8").splitlines()
+    assert 'n8n_import_stage_calls_total{stage="parse"} 1' in lines
+    assert "n8n_import_bytes_read_total 10" in lines
+    assert 'n8n_import_n8n_responses_total{method="POST",status="429"} 1' in lines
+    assert 'n8n_import_n8n_request_seconds_bucket{method="POST",le="0.01"} 0' in lines
+    assert 'n8n_import_n8n_request_seconds_bucket{method="POST",le="0.025"} 1' in lines
+    assert 'n8n_import_n8n_request_seconds_bucket{method="POST",le="+Inf"} 2' in lines
+    assert 'n8n_import_n8n_request_seconds_count{method="POST"} 2' in lines
+    events = [json.loads(line) for line in (tmp_path / "run.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert [(event["event"], event["processed"]) for event in events] == [("progress", 100)]
+
+
+def test_resume_replays_journal_without_listing(tmp_path: Path, mock_n8n: MockFactory) -> None:
+    state, url = mock_n8n()
+    index = ImportIndex(tmp_path / "index.sqlite")
+    workflows = [normalize_workflow(raw, "golden.json") for raw in RAW_WORKFLOWS]
+    candidates = [WorkflowCandidate(source="golden.json", workflow=wf) for wf in workflows if wf]
+
+    def crashing() -> Iterator[WorkflowCandidate]:
+        yield from candidates[:2]
+        raise KeyboardInterrupt
+
+    try:
+        client = N8nApiClient(url, "key")
+        journal = ImportJournal(tmp_path / "journal.jsonl", "v1")
+        with pytest.raises(KeyboardInterrupt):
+            import_candidates(
+                client,
+                crashing(),
+                tmp_path / "first.json",
+                concurrency=2,
+                fingerprint_index=index,
+                journal=journal,
+            )
+        journal.close()
+        first = json.loads((tmp_path / "first.json").read_text(encoding="utf-8"))
+
+        def no_listing() -> Iterator[Dict]:
+            raise AssertionError("resume must not list n8n")
+
+        client.iter_workflows = no_listing  # type: ignore[method-assign]
+        journal = ImportJournal(tmp_path / "journal.jsonl", "v1", resume=True)
+        second = import_candidates(
+            client, candidates, tmp_path / "second.json", fingerprint_index=index, journal=journal
+        )
+        journal.close()
+    finally:
+        index.close()
+
+    assert (first["imported"], first["interrupted"]) == (2, True)
+    assert (second["resumedEntries"], second["skippedDuplicates"]) == (2, 2)
+    assert second["imported"] == len(candidates) - 2
+    assert len(state.workflows) == len(candidates)
+
+
+def test_walker_prunes_ignored_dirs_and_sniffs_content(tmp_path: Path) -> None:
+    workflow = {"name": "wf", "nodes": [{"name": "a", "type": "b"}], "connections": {}}
+    for relative, payload in [
+        ("b/wf.json", workflow),
+        ("a/wf.json", workflow),
+        ("a/package.json", {"name": "pkg", "dependencies": {}}),
+        ("a/node_modules/dep/wf.json", workflow),
+        (".git/wf.json", workflow),
+        ("a/notes.txt", workflow),
+    ]:
+        path = tmp_path / "root" / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload), encoding="utf-8")
+
+    found = [path.relative_to(tmp_path / "root").as_posix() for path in discover_local_json_files([tmp_path / "root"])]
+    assert found == ["a/package.json", "a/wf.json", "b/wf.json"]
+    index = ImportIndex(tmp_path / "index.sqlite")
+    try:
+        assert scan_json_file(tmp_path / "root/a/package.json", index) == []
+        assert [c.name for c in scan_json_file(tmp_path / "root/a/wf.json", index)] == ["wf"]
+    finally:
+        index.close()
+
+
+def test_identical_sources_are_parsed_once_and_attributed(tmp_path: Path, mock_n8n: MockFactory) -> None:
+    workflow = {"name": "wf", "nodes": [{"name": "a", "type": "b"}], "connections": {}}
+    for relative in ("a/wf.json", "b/copy.json"):
+        path = tmp_path / "root" / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(workflow), encoding="utf-8")
+    with zipfile.ZipFile(tmp_path / "export.zip", "w") as archive:
+        archive.writestr("wf.json", json.dumps(workflow))
+
+    stats = {"files": 0, "candidates": 0}
+    refs = discover_sources([tmp_path / "root", tmp_path / "root" / "a"], [tmp_path / "export.zip"] * 2)
+    index = ImportIndex(tmp_path / "index.sqlite")
+    try:
+        scanned = list(iter_source_candidates(refs, stats, index))
+    finally:
+        index.close()
+    assert stats == {"files": 3, "candidates": 1}
+    first = str(tmp_path / "root/a/wf.json")
+    assert [c.duplicate_of for c in scanned] == [None, first, first]
+
+    _, url = mock_n8n()
+    summary = import_candidates(N8nApiClient(url, "key"), scanned, tmp_path / "report.json")
+    rows = [json.loads(line) for line in (tmp_path / "report.rows.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert summary["totalCandidates"] == 1 and summary["duplicateSources"] == 2
+    assert sorted(row["source"] for row in rows if row["outcome"] == "duplicateSources") == sorted(
+        [str(tmp_path / "root/b/copy.json"), f"{tmp_path / 'export.zip'}:wf.json"]
+    )
+
+
+def test_source_tasks_overlap_but_keep_task_order(tmp_path: Path) -> None:
+    workflow = {"name": "wf", "nodes": [{"name": "a", "type": "b"}], "connections": {}}
+    archives = []
+    for name in ("slow", "fast"):
+        with zipfile.ZipFile(tmp_path / f"{name}.zip", "w") as archive:
+            archive.writestr(f"{name}.json", json.dumps(workflow))
+        archives.append(tmp_path / f"{name}.zip")
+
+    # Both downloads must be in flight at once to get past the barrier; a
+    # serial scheduler would leave the first one waiting until it breaks.
+    barrier = threading.Barrier(2, timeout=10)
+
+    def download(path: Path):
+        def prepare():
+            barrier.wait()
+            return path, "downloaded"
+
+        return prepare
+
+    tasks = [
+        SourceTask("slow", "repo", prepare=download(archives[0])),
+        SourceTask("fast", "repo", prepare=download(archives[1])),
+        SourceTask("missing", "repo", prepare=lambda: (None, "download failed")),
+    ]
+    refs = list(schedule_sources(tasks))
+    assert [ref.member for ref in refs] == ["slow.json", "fast.json"]
+    assert [task.timing["files"] for task in tasks] == [1, 1, 0]
+    assert [task.timing["status"] for task in tasks] == ["downloaded", "downloaded", "download failed"]
+
+
+def test_one_scan_fans_out_to_every_target(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, mock_n8n: MockFactory
+) -> None:
+    for name in ("one", "two"):
+        workflow = {"name": name, "nodes": [{"name": "a", "type": name}], "connections": {}}
+        (tmp_path / "root").mkdir(exist_ok=True)
+        (tmp_path / "root" / f"{name}.json").write_text(json.dumps(workflow), encoding="utf-8")
+    states, urls = zip(mock_n8n(), mock_n8n())
+    states[1].create({"name": "two", "nodes": [{"name": "a", "type": "two"}], "connections": {}})
+    argv = ["n8n_master_import.py", "--skip-online", "--local-root", str(tmp_path / "root")]
+    argv += ["--report", str(tmp_path / "report.json"), "--n8n-api-key", "key"]
+    for url in urls:
+        argv += ["--n8n-url", url]
+    monkeypatch.setattr("sys.argv", argv)
+    assert main() == 0
+
+    report = json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+    assert [(t["imported"], t["skippedDuplicates"]) for t in report["targets"]] == [(2, 0), (1, 1)]
+    assert all(Path(t["report"]).exists() for t in report["targets"])
+    assert [state.stats["created"] for state in states] == [2, 2]
+    assert report["sources"][0]["files"] == 2
+
+
+def test_failing_target_does_not_stall_the_others(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, mock_n8n: MockFactory
+) -> None:
+    import n8n_master_import
+
+    (tmp_path / "root").mkdir()
+    for i in range(30):
+        workflow = {"name": f"wf {i}", "nodes": [{"name": "a", "type": f"t{i}"}], "connections": {}}
+        (tmp_path / "root" / f"{i:02d}.json").write_text(json.dumps(workflow), encoding="utf-8")
+    healthy, healthy_url = mock_n8n()
+    _, locked_url = mock_n8n(api_key="other key")
+    argv = ["n8n_master_import.py", "--skip-online", "--local-root", str(tmp_path / "root"), "--n8n-api-key", "key"]
+    argv += ["--report", str(tmp_path / "report.json"), "--n8n-url", locked_url, "--n8n-url", healthy_url]
+    monkeypatch.setattr("sys.argv", argv)
+    monkeypatch.setattr(n8n_master_import, "STAGE_QUEUE_SIZE", 2)
+    result: List[int] = []
+    runner = threading.Thread(target=lambda: result.append(main()), daemon=True)
+    runner.start()
+    runner.join(timeout=60)
+
+    assert not runner.is_alive() and result == [1]
+    report = json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+    assert "401" in report["targets"][0]["error"]
+    assert report["targets"][1]["imported"] == healthy.stats["created"] == 30
+
+
+def test_unreachable_target_is_reported_and_the_others_import(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, mock_n8n: MockFactory
+) -> None:
+    (tmp_path / "root").mkdir()
+    for i in range(5):
+        workflow = {"name": f"wf {i}", "nodes": [{"name": "a", "type": f"t{i}"}], "connections": {}}
+        (tmp_path / "root" / f"{i}.json").write_text(json.dumps(workflow), encoding="utf-8")
+    healthy, healthy_url = mock_n8n()
+    argv = ["n8n_master_import.py", "--skip-online", "--local-root", str(tmp_path / "root"), "--n8n-api-key", "key"]
+    argv += ["--report", str(tmp_path / "report.json"), "--max-retries", "0"]
+    argv += ["--n8n-url", "http://127.0.0.1:1", "--n8n-url", healthy_url]
+    monkeypatch.setattr("sys.argv", argv)
+    assert main() == 1
+
+    report = json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+    assert "healthcheck failed" in report["targets"][0]["error"]
+    assert report["targets"][1]["imported"] == healthy.stats["created"] == 5
+
+
+def test_catalog_round_trip_imports_without_scanning(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, mock_n8n: MockFactory
+) -> None:
+    import n8n_master_import
+
+    (tmp_path / "root").mkdir()
+    workflows = [normalize_workflow(raw, "golden.json") for raw in RAW_WORKFLOWS]
+    (tmp_path / "root" / "pack.json").write_text(json.dumps([wf for wf in workflows if wf]), encoding="utf-8")
+    (tmp_path / "root" / "copy.json").write_text(json.dumps([wf for wf in workflows if wf]), encoding="utf-8")
+    states = []
+
+    def run(*extra: str) -> Dict:
+        state, url = mock_n8n()
+        states.append(state)
+        argv = ["n8n_master_import.py", "--skip-online", "--n8n-api-key", "key", *extra]
+        argv += ["--n8n-url", url, "--report", str(tmp_path / "r.json")]
+        monkeypatch.setattr("sys.argv", argv)
+        assert main() == 0
+        return json.loads((tmp_path / "r.json").read_text(encoding="utf-8"))
+
+    scanned = run("--local-root", str(tmp_path / "root"), "--write-catalog", str(tmp_path / "wf.catalog"))
+    catalog = CandidateCatalog(tmp_path / "wf.catalog")
+    try:
+        entries = list(catalog)
+        assert len(entries) == len([wf for wf in workflows if wf]) + 1
+        assert entries[-1].duplicate_of == str(tmp_path / "root" / "copy.json")
+        assert entries[0].workflow is None
+        assert entries[0].node_types == ("n8n-nodes-base.set", "n8n-nodes-base.slack", "n8n-nodes-base.webhook")
+        assert [entry.ref.load() for entry in entries[:-1]] == [wf for wf in workflows if wf]
+    finally:
+        catalog.close()
+
+    # A damaged index is reported as a bad catalog rather than a zlib/KeyError traceback.
+    data = (tmp_path / "wf.catalog").read_bytes()
+    magic = n8n_master_import.CATALOG_MAGIC
+    offset, length = struct.unpack(">QI", data[-struct.calcsize(">QI") - len(magic) : -len(magic)])
+
+    def with_index(index: bytes) -> bytes:
+        return data[:offset] + index + struct.pack(">QI", offset, len(index)) + magic
+
+    corrupt = tmp_path / "corrupt.catalog"
+    for damaged in (
+        data[:offset] + bytes(length) + data[offset + length :],
+        with_index(zlib.compress(b'{"sources": []}')),
+        with_index(zlib.compress(b"[1, 2]")),
+        with_index(b"not zlib"),
+    ):
+        corrupt.write_bytes(damaged)
+        with pytest.raises(ValueError, match="is not a workflow catalog"):
+            CandidateCatalog(corrupt)
+    monkeypatch.setattr("sys.argv", ["n8n_master_import.py", "--from-catalog", str(corrupt), "--n8n-api-key", "key"])
+    assert main() == 2
+
+    for path in (tmp_path / "root").iterdir():
+        path.unlink()
+    loaded = run("--from-catalog", str(tmp_path / "wf.catalog"), "--no-index")
+    assert loaded["imported"] == scanned["imported"] > 0
+    assert loaded["duplicateSources"] == scanned["duplicateSources"] == 1
+    assert [state.stats["created"] for state in states] == [scanned["imported"]] * 2
+
+
+def test_node_type_filters_use_index_and_catalog_profiles(tmp_path: Path) -> None:
+    def workflow(name: str, *types: str) -> Dict:
+        nodes = [{"name": f"n{i}", "type": f"n8n-nodes-base.{t}"} for i, t in enumerate(types)]
+        nodes[0]["credentials"] = {f"{types[0]}Api": {"id": "1"}}
+        return {"name": name, "nodes": nodes, "connections": {}}
+
+    (tmp_path / "root").mkdir()
+    pack = [
+        workflow("Bot", "telegram", "openAi"),
+        workflow("Alerts", "telegramTrigger", "slack"),
+        workflow("Big bot", "telegram", "openAi", "set", "set", "if"),
+        workflow("Digest", "openAi", "gmail"),
+    ]
+    (tmp_path / "root" / "pack.json").write_text(json.dumps(pack), encoding="utf-8")
+    selection = CandidateFilter(("telegram", "n8n-nodes-base.openai"), ("gmail",), max_nodes=4)
+    index = ImportIndex(tmp_path / "index.sqlite")
+    writer = CatalogWriter(tmp_path / "wf.catalog", "test")
+    try:
+        for _ in range(2):
+            stats = {"files": 0, "candidates": 0, "filtered": 0}
+            scanned = list(iter_source_candidates(discover_sources([tmp_path / "root"]), stats, index))
+            assert [c.name for c in select_candidates(scanned, selection, stats)] == ["Bot"]
+            assert stats["filtered"] == 3
+        assert all(c.workflow is None and c.node_count for c in scanned)
+        assert scanned[0].credential_types == ("telegramApi",)
+        for candidate in scanned:
+            writer.add(candidate)
+        writer.close()
+    finally:
+        index.close()
+
+    catalog = CandidateCatalog(tmp_path / "wf.catalog")
+    try:
+        assert [c.name for c in catalog.select(selection)] == ["Bot"]
+        assert [c.name for c in catalog.select(CandidateFilter(("telegramapi",)))] == ["Bot", "Big bot"]
+        assert [c.name for c in catalog.select(CandidateFilter(name_pattern=re.compile("^B")))] == ["Bot", "Big bot"]
+    finally:
+        catalog.close()
+
+
+def test_preflight_rejects_unknown_nodes_without_sending(tmp_path: Path, mock_n8n: MockFactory) -> None:
+    state, url = mock_n8n(
+        node_types=[{"name": "n8n-nodes-base.set", "version": [1, 2]}, {"name": "n8n-nodes-base.slack", "version": 2}],
+        credential_types=[{"name": "slackApi"}],
+    )
+
+    def workflow(name: str, node_type: str, version: float, credential: str = "") -> WorkflowCandidate:
+        node = {"name": "n", "type": f"n8n-nodes-base.{node_type}", "typeVersion": version}
+        if credential:
+            node["credentials"] = {credential: {"id": "1"}}
+        raw = {"name": name, "nodes": [node], "connections": {}}
+        return WorkflowCandidate(source=f"{name}.json", workflow=normalize_workflow(raw, f"{name}.json"))
+
+    candidates = [
+        workflow("ok", "set", 2, ""),
+        workflow("community", "telegram", 1),
+        workflow("old slack", "slack", 1, "slackApi"),
+        workflow("bad credential", "set", 1, "fooApi"),
+        workflow("also community", "telegram", 1.1),
+    ]
+    cache = tmp_path / "nodetypes.json"
+    client = N8nApiClient(url, "key")
+    node_catalog = NodeTypeCatalog.load(client, cache, ttl=60)
+    summary = import_candidates(
+        client, candidates, tmp_path / "report.json", node_catalog=node_catalog, quarantine_dir=tmp_path / "q"
+    )
+    state.node_types = state.credential_types = None
+    assert NodeTypeCatalog.load(client, cache, ttl=60).versions == node_catalog.versions
+    assert NodeTypeCatalog.load(client, cache, ttl=0) is None
+
+    assert (summary["imported"], summary["failed"], summary["rejected"]) == (1, 0, 4)
+    assert summary["rejectedByType"] == {
+        "type:n8n-nodes-base.telegram": 2,
+        "credential:fooApi": 1,
+        "version:n8n-nodes-base.slack@1": 1,
+    }
+    assert state.stats["created"] == 1 and len(list((tmp_path / "q").iterdir())) == 4
+
+
+def test_index_hits_parse_each_source_once_on_import(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, mock_n8n: MockFactory
+) -> None:
+    import n8n_master_import
+
+    pack = [{"name": f"wf {i}", "nodes": [{"name": "a", "type": f"t{i}"}], "connections": {}} for i in range(40)]
+    (tmp_path / "root").mkdir()
+    (tmp_path / "root" / "pack.json").write_text(json.dumps(pack[:20]), encoding="utf-8")
+    with zipfile.ZipFile(tmp_path / "root" / "packs.zip", "w") as archive:
+        archive.writestr("a.json", json.dumps(pack[20:30]))
+        archive.writestr("b.json", json.dumps(pack[30:]))
+    index = ImportIndex(tmp_path / "index.sqlite")
+    parses: List[str] = []
+    parse = n8n_master_import.parse_json_source
+
+    def counting_parse(source: str, data: bytes, dedupe_mode: str = "exact"):
+        parses.append(source)
+        return parse(source, data, dedupe_mode)
+
+    try:
+        stats = {"files": 0, "candidates": 0}
+        list(iter_source_candidates(discover_sources([tmp_path / "root"]), stats, index))
+        scanned = list(iter_source_candidates(discover_sources([tmp_path / "root"]), stats, index))
+        assert len(scanned) == 40 and all(candidate.workflow is None for candidate in scanned)
+        monkeypatch.setattr(n8n_master_import, "parse_json_source", counting_parse)
+        _, url = mock_n8n()
+        summary = import_candidates(N8nApiClient(url, "key"), scanned, tmp_path / "report.json")
+    finally:
+        index.close()
+    assert summary["imported"] == 40
+    assert sorted(parses) == sorted({candidate.source for candidate in scanned})
+
+
+def test_pooled_scan_matches_serial_scan(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    import n8n_master_import
+
+    root = tmp_path / "root"
+    root.mkdir()
+    for i in range(12):
+        workflows = [_pipeline(f"wf {i}.{j}", ["set", "if", f"type{i}", f"type{j}"]) for j in range(3)]
+        (root / f"pack{i:02}.json").write_text(json.dumps(workflows), encoding="utf-8")
+    (root / "pack99.json").write_text((root / "pack03.json").read_text(encoding="utf-8"), encoding="utf-8")
+    with zipfile.ZipFile(root / "archive.zip", "w") as archive:
+        for i in range(4):
+            archive.writestr(f"member{i}.json", json.dumps(_pipeline(f"zipped {i}", ["code", f"z{i}"])))
+    bundle = {"workflows": [_pipeline(f"bundled {i}", ["merge", f"b{i}"] * 5) for i in range(20)]}
+    (root / "pack05_large.json").write_text(json.dumps(bundle), encoding="utf-8")
+    # One source streams, and small chunks keep several parse jobs in flight.
+    monkeypatch.setattr(n8n_master_import, "STREAM_PARSE_BYTES", 20_000)
+    monkeypatch.setattr(n8n_master_import, "PARSE_CHUNK_FILES", 3)
+    assert (root / "pack05_large.json").stat().st_size > 20_000 > (root / "pack00.json").stat().st_size
+
+    def scan(workers: int) -> Tuple[List[Tuple], Dict[str, int]]:
+        stats = {"files": 0, "candidates": 0}
+        candidates = iter_source_candidates(discover_sources([root]), stats, workers=workers)
+        rows = [(c.source, c.name, c.fingerprint, c.duplicate_of) for c in candidates]
+        return rows, stats
+
+    serial, pooled = scan(0), scan(2)
+    assert pooled == serial
+    rows, stats = serial
+    assert stats == {"files": 18, "candidates": 60}
+    assert sum(1 for row in rows if row[0].endswith("pack05_large.json")) == 20
+    assert {row[3] for row in rows if row[0].endswith("pack99.json")} == {str(root / "pack03.json")}
+
+
+def test_streaming_parser_matches_whole_file_extraction() -> None:
+    workflows = [raw for raw in RAW_WORKFLOWS if isinstance(raw, dict)]
+    payloads = [
+        workflows,
+        {"workflows": workflows, "count": 1.5e3, "meta": {"nested": [1, 2, {"x": "]}"}]}},
+        {"name": "bundle", "nodes": [{"name": "n", "type": "t"}], "connections": {}, "workflow": workflows[0]},
+        [],
+        {},
+    ]
+    for payload in payloads:
+        data = json.dumps(payload, indent=1, ensure_ascii=False).encode("utf-8")
+        expected = extract_workflows_from_json(payload, "bundle.json")
+        for chunk_size in (1, 7, 1 << 20):
+            streamed = list(iter_json_stream_workflows(io.BytesIO(data), "bundle.json", chunk_size))
+            # A bundle that is itself a workflow is yielded after its "workflows" entries.
+            assert sorted(map(json.dumps, streamed)) == sorted(map(json.dumps, expected))
+
+    truncated = json.dumps(workflows).encode("utf-8")[:-40]
+    streamed = list(iter_json_stream_workflows(io.BytesIO(truncated), "bundle.json", 64))
+    assert streamed == extract_workflows_from_json(workflows, "bundle.json")[:-1]
+
+
+def test_repo_download_falls_back_to_cached_archive(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    import n8n_master_import
+
+    def offline(*args, **kwargs):
+        raise n8n_master_import.requests.ConnectionError("name resolution failed")
+
+    monkeypatch.setattr(n8n_master_import.requests, "get", offline)
+    download = n8n_master_import._download_repo_archive
+    assert download("owner/repo", tmp_path) == (None, "download failed")
+
+    cached = tmp_path / "owner__repo__master.zip"
+    with zipfile.ZipFile(cached, "w") as archive:
+        archive.writestr("wf.json", "{}")
+    (tmp_path / "owner__repo__master.etag").write_text('"abc"', encoding="utf-8")
+    assert download("owner/repo", tmp_path) == (cached, "cached (revalidation failed)")
+    assert not list(tmp_path.glob("*.part"))
+
+    class Response:
+        def __init__(self, status_code: int) -> None:
+            self.status_code = status_code
+            self.headers: Dict[str, str] = {}
+
+        def __enter__(self) -> "Response":
+            return self
+
+        def __exit__(self, *exc_info: object) -> None:
+            return None
+
+    requested: List[str] = []
+
+    def unavailable(url: str, **kwargs):
+        requested.append(url.rsplit("/", 1)[-1])
+        return Response(503 if url.endswith("/main") else 404)
+
+    # codeload is rate limited or down: the cached main archive is used and
+    # master, which would 404, is never tried.
+    monkeypatch.setattr(n8n_master_import.requests, "get", unavailable)
+    cache_dir = tmp_path / "rate-limited"
+    cache_dir.mkdir()
+    cached = cache_dir / "owner__repo__main.zip"
+    with zipfile.ZipFile(cached, "w") as archive:
+        archive.writestr("wf.json", "{}")
+    (cache_dir / "owner__repo__main.etag").write_text('"abc"', encoding="utf-8")
+    assert download("owner/repo", cache_dir) == (cached, "cached (revalidation failed)")
+    assert requested == ["main"]
+    assert download("owner/other", cache_dir) == (None, "download failed")